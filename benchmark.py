@@ -0,0 +1,431 @@
+import argparse
+import hashlib
+import html
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from lxml import html as lxml_html
+
+import hilton
+import hilton_html
+import hilton_pets
+from crawl_profile import profiled
+from hilton_html import iter_snapshots, save_snapshot
+
+# ================== CONFIG ==================
+
+FIXTURE_DIR = "bench_fixtures"
+RESULTS_FILE = "benchmark_results.jsonl"
+# Source for `synth`: hotels scraped earlier, turned into popup snapshots
+SYNTH_SOURCE = "hilton_pet_friendly_hotels.json"
+SYNTH_HOTELS = 40
+CARDS_PER_PAGE = 10
+# Simulated server time for a popup, so runs are not dominated by localhost speed
+POPUP_DELAY_MS = 50
+MICRO_MIN_TIME = 0.2
+
+
+# ================== FIXTURES ==================
+
+def fake_ctyhocn(name):
+    return hashlib.sha1(name.encode("utf-8")).hexdigest()[:7]
+
+
+def slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def popup_html_for(record):
+    """Popup markup in Hilton's structure (the XPaths hilton.py and hilton_html.py use)."""
+    e = html.escape
+    code = fake_ctyhocn(record["hotel_name"])
+    overview = json.loads(record.get("overview_table_json") or "{}")
+    amenities = json.loads(record.get("amenities_json") or "[]")
+    nearby = json.loads(record.get("nearby_json") or "[]")
+    airport = json.loads(record.get("airport_json") or "[]")
+    rows = "".join(f"<tr><th>{e(k)}</th><td>{e(v)}</td></tr>" for k, v in overview.items())
+    labels = "".join(
+        f"<li><span data-testid='hotelAmenityLabel'>{e(a)}</span></li>" for a in amenities
+    )
+    places = "".join(
+        f"<li><div><span>{e(n['place'])}</span></div><div>{e(n['distance'])}</div></li>" for n in nearby
+    )
+    airports = "".join(
+        f"<li><div><div><span>✈</span><span>{e(a['airport'])}</span></div><div>{e(a['distance'])}</div></div>"
+        f"<p>{e(a.get('shuttle') or '')}</p></li>"
+        for a in airport
+    )
+    return (
+        "<div class='relative flex size-full flex-col overflow-y-auto' tabindex='-1'>"
+        f"<h2>{e(record['hotel_name'])}</h2>"
+        f"<p>{e(record.get('rating') or '')}</p>"
+        f"<div><p class='inline text-start md:block'>{e(record.get('description') or '')}</p></div>"
+        f"<a href='/en/hotels/{code}-{slug(record['hotel_name'])}/'>Hotel website</a>"
+        f"<p>{e(record.get('phone') or '')}</p>"
+        f"<table><tbody>{rows}</tbody></table>"
+        f"<ul class='peer flex flex-wrap'>{labels}</ul>"
+        "<div role='tablist'><button id='nearBy'>Nearby</button><button id='airport'>Airport info</button></div>"
+        f"<div id='tab-panel-nearBy'><ul>{places}</ul></div>"
+        f"<div id='tab-panel-airport' hidden><ul>{airports}</ul></div>"
+        "</div>"
+    )
+
+
+def synth_fixtures(directory, source=SYNTH_SOURCE, count=SYNTH_HOTELS):
+    """Write `count` popup snapshots built from previously scraped hotels."""
+    with open(source, encoding="utf-8") as f:
+        records = json.load(f)
+    written = 0
+    for record in records:
+        if written == count:
+            break
+        if not record.get("overview_table_json") or record.get("hotel_name") in (None, "", "UNKNOWN"):
+            continue
+        snapshot = {
+            "html": popup_html_for(record),
+            "address": record.get("address") or "",
+            "price": record.get("card_price") or "",
+        }
+        save_snapshot(directory, fake_ctyhocn(record["hotel_name"]), snapshot)
+        written += 1
+    print(f"🧪 Wrote {written} popup fixtures to {directory}")
+    return written
+
+
+def load_fixtures(directory):
+    if not os.path.isdir(directory) or not any(f.endswith(".json") for f in os.listdir(directory)):
+        synth_fixtures(directory)
+    hotels = []
+    for name, snapshot in iter_snapshots(directory):
+        details = hilton_html.parse_popup_html(snapshot["html"])
+        hotels.append({
+            "code": (details["ctyhocn"] or name).lower(),
+            "name": details["name"],
+            "rating": details["rating"],
+            "price": snapshot.get("price", ""),
+            "address": snapshot.get("address", ""),
+            "html": snapshot["html"],
+        })
+    return hotels
+
+
+# ================== FIXTURE SITE ==================
+
+RESULTS_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Pet-friendly hotels</title></head>
+<body>
+<ul id="cards">__CARDS__</ul>
+<nav id="pagination"><span aria-current="page">__PAGE__</span>
+<button id="pagination-right" class="__NEXT_CLASS__">Next</button></nav>
+<script>
+const TOTAL_PAGES = __TOTAL__;
+let page = __PAGE__;
+document.addEventListener("click", async (event) => {
+    const view = event.target.closest("button[data-code]");
+    if (view) {
+        const response = await fetch("/popup/" + view.dataset.code);
+        const modal = document.createElement("div");
+        modal.id = "modal";
+        modal.innerHTML = await response.text();
+        document.body.appendChild(modal);
+        modal.firstElementChild.focus();
+        return;
+    }
+    if (event.target.id === "pagination-right" && page < TOTAL_PAGES) {
+        page += 1;
+        const response = await fetch("/cards?page=" + page);
+        document.getElementById("cards").innerHTML = await response.text();
+        document.querySelector("[aria-current='page']").innerText = page;
+        event.target.className = page >= TOTAL_PAGES ? "disabled" : "";
+        history.replaceState(null, "", "/?page=" + page);
+    }
+});
+document.addEventListener("keydown", (event) => {
+    const modal = document.getElementById("modal");
+    if (event.key === "Escape" && modal) modal.remove();
+});
+</script>
+</body></html>
+"""
+
+
+def render_cards(hotels):
+    e = html.escape
+    return "".join(
+        f"<li data-ctyhocn='{h['code']}'><h3>{e(h['name'])}</h3>"
+        f"<p>{e(h['rating'])}</p><span data-testid='locationMarker'>{e(h['address'])}</span>"
+        f"<span data-testid='rateItem'>{e(h['price'])}</span>"
+        f"<a href='/en/hotels/{h['code']}-{slug(h['name'])}/'>{e(h['name'])}</a>"
+        f"<button data-code='{h['code']}'><span>View hotel details</span></button></li>"
+        for h in hotels
+    )
+
+
+class FixtureSite:
+    """Local stand-in for the results pages and hotel modals, served from fixtures."""
+
+    def __init__(self, hotels, per_page=CARDS_PER_PAGE, popup_delay_ms=POPUP_DELAY_MS):
+        self.hotels = hotels
+        self.by_code = {h["code"]: h for h in hotels}
+        self.per_page = per_page
+        self.pages = max(1, -(-len(hotels) // per_page))
+        self.popup_delay = popup_delay_ms / 1000
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}/"
+
+    def page_hotels(self, page):
+        return self.hotels[(page - 1) * self.per_page:page * self.per_page]
+
+    def results_page(self, page):
+        return (RESULTS_PAGE
+                .replace("__CARDS__", render_cards(self.page_hotels(page)))
+                .replace("__PAGE__", str(page))
+                .replace("__TOTAL__", str(self.pages))
+                .replace("__NEXT_CLASS__", "disabled" if page >= self.pages else ""))
+
+    def handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                page = min(max(int(query.get("page", ["1"])[0]), 1), site.pages)
+                if parts.path == "/":
+                    self.send(site.results_page(page))
+                elif parts.path == "/cards":
+                    self.send(render_cards(site.page_hotels(page)))
+                elif parts.path.startswith("/popup/") and parts.path[7:] in site.by_code:
+                    time.sleep(site.popup_delay)
+                    self.send(site.by_code[parts.path[7:]]["html"])
+                else:
+                    self.send_error(404)
+
+            def send(self, body):
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# ================== BENCHMARKS ==================
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q / 100 * (len(ordered) - 1)))]
+
+
+def run_end_to_end(hotels, per_page=CARDS_PER_PAGE, popup_delay_ms=POPUP_DELAY_MS, command_budget=None):
+    """Drive hilton.main() against the fixture site with throwaway output files."""
+    with FixtureSite(hotels, per_page, popup_delay_ms) as site, tempfile.TemporaryDirectory() as tmp:
+        hilton.START_URL = site.url
+        hilton.HTML_DIR = ""
+        hilton.OUTPUT_FILE_CSV = os.path.join(tmp, "hotels.csv")
+        hilton.OUTPUT_FILE_JSON = os.path.join(tmp, "hotels.json")
+        hilton.OUTPUT_FILE_JSONL = os.path.join(tmp, "hotels.jsonl")
+        hilton.STATE_FILE = os.path.join(tmp, "state.json")
+        hilton.INDEX_FILE = os.path.join(tmp, "index.sqlite")
+        hilton.STORE_FILE = os.path.join(tmp, "hotels.sqlite")
+
+        counter = hilton.CommandCounter(command_budget, "fail" if command_budget is not None else "warn")
+        started = time.perf_counter()
+        hilton.main(counter)
+        elapsed = time.perf_counter() - started
+        saved = len(hilton.read_jsonl())
+
+    latencies = counter.latencies
+    return {
+        "fixture_hotels": len(hotels),
+        "pages": site.pages,
+        "hotels": saved,
+        "errors": counter.errors,
+        "elapsed_s": elapsed,
+        "hotels_per_min": saved / elapsed * 60 if elapsed else 0.0,
+        "latency_p50_s": percentile(latencies, 50),
+        "latency_p95_s": percentile(latencies, 95),
+        "commands_per_hotel": counter.average(),
+        "call_sites": [
+            {"site": site, "command": command, "calls": calls, "seconds": seconds}
+            for site, command, calls, seconds in counter.top_sites()
+        ],
+    }
+
+
+def time_calls(fn, inputs, min_time=MICRO_MIN_TIME):
+    """Mean µs per call of fn over inputs, repeating the inputs for at least min_time."""
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        for value in inputs:
+            fn(value)
+        calls += len(inputs)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return {"us_per_call": elapsed / calls * 1e6, "calls": calls}
+
+
+def run_micro(hotels, min_time=MICRO_MIN_TIME):
+    """Parser timings on the fixtures (lxml backend, which runs without a browser)."""
+    roots = [lxml_html.fromstring(h["html"]) for h in hotels]
+    overviews = [hilton_html.parse_overview_table(root) for root in roots]
+    pets = [v for o in overviews for k, v in o.items() if "pet" in k.lower()]
+    fees = pets + [v for o in overviews for k, v in o.items() if "park" in k.lower()]
+    details = [hilton_html.parse_popup_html(h["html"]) for h in hotels]
+
+    cases = {
+        "parse_overview_table": (hilton_html.parse_overview_table, roots),
+        "parse_amenities": (hilton_html.parse_amenities, roots),
+        "parse_nearby": (hilton_html.parse_nearby, roots),
+        "parse_airport_info": (hilton_html.parse_airport_info, roots),
+        "parse_popup_html": (hilton_html.parse_popup_html, [h["html"] for h in hotels]),
+        "build_hotel_record": (lambda d: hilton.build_hotel_record(d["ctyhocn"], d), details),
+        "extract_money": (hilton.extract_money, fees),
+        "extract_weight": (hilton.extract_weight, pets),
+        # Uncached: the live path memoizes repeated policy texts
+        "parse_pet_policy": (hilton_pets.parse_pet_policy.__wrapped__, pets),
+    }
+    return {name: time_calls(fn, inputs, min_time) for name, (fn, inputs) in cases.items() if inputs}
+
+
+def git_version():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+def last_result(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        lines = [line for line in f if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+
+def print_report(result, previous=None):
+    def delta(section, key, current):
+        before = ((previous or {}).get(section) or {}).get(key)
+        if isinstance(before, dict):
+            before = before.get("us_per_call")
+        if not before or current is None:
+            return ""
+        return f" ({(current - before) / before:+.0%} vs {previous.get('version') or 'previous'})"
+
+    e2e = result.get("e2e")
+    if e2e:
+        print(f"⏱ End to end: {e2e['hotels']}/{e2e['fixture_hotels']} hotels over {e2e['pages']} pages "
+              f"in {e2e['elapsed_s']:.1f}s")
+        print(f"   hotels/min {e2e['hotels_per_min']:.1f}{delta('e2e', 'hotels_per_min', e2e['hotels_per_min'])}")
+        for key in ("latency_p50_s", "latency_p95_s"):
+            if e2e[key] is not None:
+                print(f"   {key[8:11]} latency {e2e[key]:.2f}s{delta('e2e', key, e2e[key])}")
+        print(f"   WebDriver commands/hotel {e2e['commands_per_hotel']:.1f}"
+              f"{delta('e2e', 'commands_per_hotel', e2e['commands_per_hotel'])}")
+    for name, timing in result.get("micro", {}).items():
+        print(f"🔬 {name}: {timing['us_per_call']:.1f} µs/call{delta('micro', name, timing['us_per_call'])}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the hilton.py extraction path")
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "micro", "synth", "serve"],
+                        help="run: end to end + micro (default); micro: parsers only; "
+                             "synth: (re)build fixtures from scraped hotels; serve: just serve the fixture site")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR,
+                        help="popup snapshots (hilton.py --extract-mode html --html-dir records real ones)")
+    parser.add_argument("--results", default=RESULTS_FILE, help="JSONL file each run is appended to")
+    parser.add_argument("--per-page", type=int, default=CARDS_PER_PAGE, help="hotel cards per results page")
+    parser.add_argument("--popup-delay-ms", type=int, default=POPUP_DELAY_MS,
+                        help="simulated server time per popup")
+    parser.add_argument("--synth-hotels", type=int, default=SYNTH_HOTELS,
+                        help="fixtures to build with synth")
+    parser.add_argument("--extract-mode", choices=["js", "html", "selenium"], default=hilton.EXTRACT_MODE,
+                        help="hilton.py extraction path to benchmark")
+    parser.add_argument("--launch-profile", choices=["default", "lean"], default="lean",
+                        help="Chrome launch profile for the end-to-end run")
+    parser.add_argument("--no-pipeline", action="store_true", help="benchmark inline parsing/writing")
+    parser.add_argument("--profile", metavar="PREFIX",
+                        help="profile the end-to-end run (fixed seed) and write PREFIX.folded/.json")
+    parser.add_argument("--command-budget", type=int,
+                        help="fail the end-to-end run if a hotel needs more WebDriver commands than this")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "synth":
+        synth_fixtures(args.fixtures, count=args.synth_hotels)
+        sys.exit()
+
+    hotels = load_fixtures(args.fixtures)
+    if args.command == "serve":
+        with FixtureSite(hotels, args.per_page, args.popup_delay_ms) as site:
+            print(f"🌐 Serving {len(hotels)} hotels on {site.pages} pages at {site.url} (Ctrl+C to stop)")
+            try:
+                site.thread.join()
+            except KeyboardInterrupt:
+                pass
+        sys.exit()
+
+    hilton.EXTRACT_MODE = args.extract_mode
+    hilton.LAUNCH_PROFILE = args.launch_profile
+    hilton.PIPELINE = not args.no_pipeline
+    result = {
+        "version": git_version(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "settings": {
+            "extract_mode": args.extract_mode,
+            "launch_profile": args.launch_profile,
+            "pipeline": not args.no_pipeline,
+            "per_page": args.per_page,
+            "popup_delay_ms": args.popup_delay_ms,
+            "command_budget": args.command_budget,
+        },
+    }
+    if args.command == "run":
+        with profiled(args.profile) as profiler:
+            result["e2e"] = run_end_to_end(hotels, args.per_page, args.popup_delay_ms, args.command_budget)
+        if profiler:
+            result["profile"] = profiler.summary()["crawl_thread"]
+    result["micro"] = run_micro(hotels)
+
+    previous = last_result(args.results)
+    print_report(result, previous)
+    with open(args.results, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    print(f"📝 Results appended to {args.results}")
@@ -0,0 +1,259 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ================== CONFIG ==================
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+EXPORT_INTERVAL = 30
+PREFIX = "crawl"
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("metrics", "stage", "started")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe("stage_seconds", time.perf_counter() - self.started, stage=self.stage)
+        if exc_type is not None:
+            self.metrics.inc("stage_failures", stage=self.stage)
+        return False
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the max for the overflow bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    """Stage spans, counters, gauges and histograms for a crawl.
+
+    Disabled by default: span() then hands back a shared no-op context and
+    inc()/set()/observe() return immediately, so instrumented loops cost one
+    attribute check per call. Enabled, everything is kept in memory and can
+    be exported as periodic JSON lines (start_export) and served in the
+    Prometheus text format (serve).
+    """
+
+    def __init__(self, enabled=False, prefix=PREFIX):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.started = time.time()
+        self.stop = threading.Event()
+        self.threads = []
+        self.server = None
+
+    def span(self, stage):
+        """Context manager timing one stage on the monotonic clock."""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, stage)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        """Gauge: remember the latest value."""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[(name, label_key(labels))] = value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    # ---------- export ----------
+
+    def snapshot(self):
+        with self.lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            gauges = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.gauges.items())
+            ]
+            histograms = [
+                {"name": name, "labels": dict(labels), **histogram.as_dict()}
+                for (name, labels), histogram in sorted(self.histograms.items())
+            ]
+        return {
+            "time": time.time(),
+            "uptime_s": time.time() - self.started,
+            "counters": counters,
+            "gauges": gauges,
+            "histograms": histograms,
+        }
+
+    def prometheus(self):
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {self.prefix}_{name}_total counter")
+                for (n, labels), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{self.prefix}_{name}_total{format_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self.gauges}):
+                lines.append(f"# TYPE {self.prefix}_{name} gauge")
+                for (n, labels), value in sorted(self.gauges.items()):
+                    if n == name:
+                        lines.append(f"{self.prefix}_{name}{format_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for (n, labels), histogram in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{format_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{metric}_bucket{format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+                    lines.append(f"{metric}_sum{format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{metric}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, path):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+
+    def start_export(self, path, interval=EXPORT_INTERVAL):
+        """Append a snapshot to `path` (JSON lines) every `interval` seconds and on close()."""
+        def loop():
+            while not self.stop.wait(interval):
+                self.write_snapshot(path)
+            self.write_snapshot(path)
+
+        thread = threading.Thread(target=loop, name="metrics-export", daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics in the Prometheus text format from a background thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        thread.start()
+        print(f"📈 Metrics at http://{host}:{self.server.server_port}/metrics")
+
+    def close(self):
+        """Write the final snapshot and stop the export threads."""
+        self.stop.set()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+# Process-wide instance the scrapers import; configure() turns it on
+metrics = Metrics()
+
+
+def configure(jsonl_path=None, port=None, interval=EXPORT_INTERVAL):
+    """Enable the shared metrics when any export is requested; returns it."""
+    if not (jsonl_path or port):
+        return metrics
+    metrics.enabled = True
+    if jsonl_path:
+        metrics.start_export(jsonl_path, interval)
+    if port:
+        metrics.serve(port)
+    return metrics
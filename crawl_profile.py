@@ -0,0 +1,176 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# ================== CONFIG ==================
+
+SAMPLE_INTERVAL = 0.005
+# Fixed seed for pacing jitter so fixture-backed profiles can be compared
+PROFILE_SEED = 1234
+
+# A sample whose stack passes through these modules is waiting on the
+# browser: Selenium's HTTP round-trips or Playwright's protocol dispatcher.
+BROWSER_IO_MODULES = (
+    "selenium.webdriver.remote",
+    "undetected_chromedriver",
+    "playwright",
+    "greenlet",
+    "urllib3",
+    "http.client",
+)
+# Other blocking waits: locks, queues, thread joins
+WAIT_MODULES = ("threading", "queue", "concurrent.futures", "selectors")
+
+CATEGORIES = ("cpu", "browser_io", "sleep", "wait")
+
+_real_sleep = time.sleep
+
+
+def profiled_sleep(seconds):
+    # Shows up as its own frame, which is how samples are classified as sleep
+    return _real_sleep(seconds)
+
+
+def frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def classify(frames):
+    """Category of a sample from its stack (outermost first)."""
+    modules = [frame.f_globals.get("__name__", "") for frame in frames]
+    if any(frame.f_code is profiled_sleep.__code__ for frame in frames):
+        return "sleep"
+    if any(module.startswith(BROWSER_IO_MODULES) for module in modules):
+        return "browser_io"
+    if modules and modules[-1].startswith(WAIT_MODULES):
+        return "wait"
+    return "cpu"
+
+
+class SamplingProfiler:
+    """Statistical profiler: samples every thread's Python stack on a timer.
+
+    Stacks are kept as folded strings ("thread;outer;...;inner"), the input
+    format of flamegraph.pl, speedscope and inferno. Each sample is also
+    classified as Python CPU, browser I/O, deliberate sleep (time.sleep is
+    wrapped while profiling) or another blocking wait.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.categories = {}
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.target = None
+        self.target_name = None
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def start(self):
+        self.target = threading.get_ident()
+        self.target_name = threading.current_thread().name
+        time.sleep = profiled_sleep
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.thread = threading.Thread(target=self.run, name="profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        time.sleep = _real_sleep
+        self.wall = time.perf_counter() - self.started
+        self.cpu = time.process_time() - self.cpu_started
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                self.sample(names.get(ident, str(ident)), ident, frame)
+            self.samples += 1
+
+    def sample(self, thread_name, ident, frame):
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+        self.stacks[";".join([thread_name] + [frame_label(f) for f in frames])] += 1
+        counts = self.categories.setdefault("crawl" if ident == self.target else thread_name, Counter())
+        counts[classify(frames)] += 1
+
+    # ---------- output ----------
+
+    def summary(self):
+        crawl = self.categories.get("crawl", Counter())
+        total = sum(crawl.values())
+        split = {c: crawl[c] / total if total else 0.0 for c in CATEGORIES}
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            if stack.startswith(self.target_name + ";"):
+                leaves[stack.rsplit(";", 1)[-1]] += count
+        return {
+            "wall_s": self.wall,
+            "process_cpu_s": self.cpu,
+            "interval_s": self.interval,
+            "samples": self.samples,
+            "crawl_thread": {c: {"share": split[c], "seconds": split[c] * self.wall} for c in CATEGORIES},
+            "threads": {name: dict(counts) for name, counts in self.categories.items()},
+            "top_leaf_functions": leaves.most_common(15),
+        }
+
+    def write(self, prefix):
+        """Write <prefix>.folded (flame graph input) and <prefix>.json (summary)."""
+        directory = os.path.dirname(prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(prefix + ".folded", "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        summary = self.summary()
+        with open(prefix + ".json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+    def report(self, summary=None):
+        summary = summary or self.summary()
+        split = summary["crawl_thread"]
+        parts = ", ".join(f"{c} {split[c]['seconds']:.1f}s ({split[c]['share']:.0%})" for c in CATEGORIES)
+        lines = [
+            f"🔥 Profile: {summary['wall_s']:.1f}s wall, {summary['process_cpu_s']:.1f}s process CPU, "
+            f"{summary['samples']} samples",
+            f"   crawl thread: {parts}",
+        ]
+        for label, count in summary["top_leaf_functions"][:5]:
+            lines.append(f"   {count:6d} samples in {label}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def profiled(prefix, interval=SAMPLE_INTERVAL, seed=PROFILE_SEED):
+    """Profile the block when `prefix` is set; writes <prefix>.folded/.json and prints a summary."""
+    if not prefix:
+        yield None
+        return
+    random.seed(seed)
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        summary = profiler.write(prefix)
+        print(profiler.report(summary))
+        print(f"🔥 Flame graph input: {prefix}.folded (flamegraph.pl / speedscope), summary: {prefix}.json")
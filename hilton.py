@@ -5,6 +5,11 @@ import re
 import csv
 import json
 import os
+import argparse
+import multiprocessing
+import queue
+import sys
+from collections import Counter
 from datetime import datetime
 
 import undetected_chromedriver as uc
@@ -18,12 +23,48 @@ from selenium.common.exceptions import (
     NoSuchElementException
 )
 
+from hilton_timing import (
+    CARDS_CHANGED,
+    CARDS_READY,
+    CLICKABLE,
+    MODAL_CLOSED,
+    Pacer,
+    card_signature,
+    ensure_script_timeout,
+    wait_for,
+)
+from resource_filter import (
+    DEFAULT_BLOCK_DOMAINS,
+    DEFAULT_BLOCK_TYPES,
+    ResourcePolicy,
+    SeleniumResourceFilter,
+)
+from crawl_metrics import configure as configure_metrics, metrics
+from crawl_profile import profiled
+from hilton_health import BrowserHealth
+from hilton_pipeline import Pipeline
+from hilton_fields import hotel_key, read_records, typed_record
+from hotel_store import STORE_FILE, HotelStore
+from hilton_pets import FIELDS as PET_FIELDS, enrich_records, parse_pet_policy
+from hilton_index import CTYHOCN_RE, HotelIndex, card_fingerprint, needs_refresh
+from hilton_capture import (
+    NetworkCapture,
+    enable_network_capture,
+    has_details,
+    hotels_from_payloads,
+    load_payloads,
+    save_payloads,
+)
+
 # ================== CONFIG ==================
 
 START_URL = "https://www.hilton.com/en/locations/pet-friendly/"
 OUTPUT_FILE_CSV = "hilton_pet_friendly_hotels.csv"
 OUTPUT_FILE_JSON = "hilton_pet_friendly_hotels.json"
+OUTPUT_FILE_JSONL = "hilton_pet_friendly_hotels.jsonl"
+OUTPUT_FILE_PARQUET = "hilton_pet_friendly_hotels.parquet"
 STATE_FILE = "hilton_last_state.json"
+INDEX_FILE = "hilton_index.sqlite"
 
 FIELDS = [
     "hotel_code",
@@ -40,21 +81,390 @@ FIELDS = [
     "nearby_json",
     "airport_json",
     "is_pet_friendly",
+    "pet_fee_amount",
+    "pet_fee_currency",
+    "pet_fee_refundable",
+    "pet_fee_basis",
+    "pet_max_weight_kg",
+    "pet_max_count",
+    "pet_species",
     "last_updated"
 ]
 
 MAX_SCROLLS = 20
-RETRY_LIMIT = 3
+
+# "jsonl" appends one line per hotel (constant cost per record),
+# "array" rewrites the whole JSON array on every hotel (legacy behaviour).
+JSON_OUTPUT_MODE = "jsonl"
+
+# "files" writes the CSV/JSON sinks, "sqlite" upserts into STORE_FILE
+# (hotel_store.py: WAL, child tables, indexed lookups), "both" does both.
+STORAGE = "both"
+
+# "js" reads the whole popup in one execute_script call, "html" captures its
+# outerHTML in one call and parses it with lxml (hilton_html.py), "selenium"
+# uses the per-element locators below. The first two fall back to them.
+EXTRACT_MODE = "js"
+# html mode: keep each popup snapshot here so it can be re-parsed in bulk
+HTML_DIR = ""
+
+# Read hotels from the GraphQL/JSON responses in Chrome's performance log
+# instead of the DOM. CAPTURE_DIR, when set, keeps those responses as fixtures.
+CAPTURE_MODE = False
+CAPTURE_DIR = ""
+# Fixture filename prefix; pool workers use their id so they do not overwrite each other
+CAPTURE_PREFIX = ""
+
+# Browserless backend: replays the requests recorded in CAPTURE_DIR.
+# HTTP_BASE_URL points it at another host, e.g. the stub server in hilton_http.py.
+HTTP_BASE_URL = ""
+HTTP_CONCURRENCY = 8
+
+# Pipeline: the browser thread only captures popups; PARSE_WORKERS threads
+# build records and one writer thread saves them in batches of up to
+# WRITE_BATCH_SIZE. The browser blocks once PIPELINE_QUEUE_SIZE items wait.
+PIPELINE = True
+PARSE_WORKERS = 2
+PIPELINE_QUEUE_SIZE = 64
+WRITE_BATCH_SIZE = 25
+
+# WebDriver commands allowed per hotel (None: no budget). "warn" reports the
+# hotel and its busiest call sites, "fail" stops the crawl.
+COMMAND_BUDGET = None
+BUDGET_ACTION = "warn"
+
+# Stage timings, counters and histograms (crawl_metrics.py); off unless an
+# export is set. In pool mode only the writer process reports.
+METRICS_JSONL = ""
+METRICS_PORT = 0
+METRICS_INTERVAL = 30
+
+# --profile: sample the crawl's stacks and write PROFILE_OUT.folded/.json
+PROFILE_OUT = "hilton_profile"
+
+# Pool mode: number of Chrome worker processes and the delay between their starts
+WORKERS = 1
+WORKER_STAGGER = 5
+# Seconds the writer waits for results before checking whether a worker died
+WORKER_POLL = 30
+
+# Incremental recrawl: only open popups for hotels whose card changed or whose
+# last extraction is older than STALE_DAYS
+INCREMENTAL = False
+STALE_DAYS = 7
+
+# Skip downloads we never read (see resource_filter.py). Allowed domains are
+# exempt from domain blocking only: type blocking is by URL extension on any host
+BLOCK_RESOURCES = True
+BLOCK_TYPES = list(DEFAULT_BLOCK_TYPES)
+BLOCK_DOMAINS = list(DEFAULT_BLOCK_DOMAINS)
+ALLOW_DOMAINS = []
+
+# "default": maximized, headed Chrome. "lean": headless=new with a small fixed
+# viewport, background services off, a shared disk cache and fewer renderers.
+LAUNCH_PROFILE = "default"
+LEAN_WINDOW_SIZE = "1280,900"
+LEAN_RENDERER_LIMIT = 2
+CHROME_CACHE_DIR = os.path.abspath("chrome-cache")
+LEAN_CHROME_ARGS = [
+    "--disable-background-networking",
+    "--disable-extensions",
+    "--disable-sync",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-features=Translate,MediaRouter,OptimizationHints",
+    "--no-first-run",
+    "--mute-audio",
+    "--disable-gpu",
+]
+
+# Browser recycling thresholds (None disables a signal); checked after every page
+MAX_JS_HEAP_MB = 1024
+MAX_DOM_NODES = 200000
+MAX_RSS_MB = 3072
+MAX_ERROR_RATE = 0.5
+
+# Waits follow page conditions (see hilton_timing); "human" adds jitter on top
+PACING_PROFILE = "fast"
+
+POPUP_SELECTOR = "div.relative.flex.size-full.flex-col.overflow-y-auto"
+POPUP_TIMEOUT = 40
+
+# Resolves with the popup element once its overview table has a filled row and
+# its amenity list (when present) has labels, or with null after the timeout.
+POPUP_READY_JS = """
+const selector = arguments[0];
+const timeoutMs = arguments[1];
+const done = arguments[arguments.length - 1];
+
+const ready = () => {
+    const popup = document.querySelector(selector);
+    if (!popup) return null;
+    const rows = Array.from(popup.querySelectorAll("table tr"));
+    if (!rows.some(tr => tr.querySelector("th") && tr.querySelector("td") && tr.innerText.trim())) return null;
+    const list = popup.querySelector("ul[class*='peer flex']");
+    if (list && !list.querySelector("span[data-testid='hotelAmenityLabel']")) return null;
+    return popup;
+};
+
+const found = ready();
+if (found) {
+    done(found);
+} else {
+    let timer = null;
+    const observer = new MutationObserver(() => {
+        const popup = ready();
+        if (popup) finish(popup);
+    });
+    const finish = (result) => {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(result);
+    };
+    observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+    timer = setTimeout(() => finish(null), timeoutMs);
+}
+"""
+
+# Results pages are addressable as START_URL?page=N
+PAGE_URL_PARAM = "page"
+PAGER_STEP_TIMEOUT = 15
+
+CURRENT_PAGE_JS = """
+const el = document.querySelector("#pagination [aria-current='page'], [aria-current='page']");
+const n = el ? parseInt(el.innerText, 10) : NaN;
+return isNaN(n) ? null : n;
+"""
+
+# Fallback when the URL parameter is ignored: drive the pager inside the
+# browser, waiting for the card list to change after each click.
+PAGER_JUMP_JS = """
+const target = arguments[0];
+const stepTimeoutMs = arguments[1];
+const done = arguments[arguments.length - 1];
+
+const current = () => {
+    const el = document.querySelector("#pagination [aria-current='page'], [aria-current='page']");
+    const n = el ? parseInt(el.innerText, 10) : NaN;
+    return isNaN(n) ? null : n;
+};
+const cards = () => {
+    const btn = document.evaluate(
+        "//button[.//span[normalize-space()='View hotel details']]",
+        document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+    ).singleNodeValue;
+    return btn ? (btn.closest("li") || btn.parentElement).innerText : "";
+};
+const changed = (before) => new Promise((resolve) => {
+    if (cards() !== before) return resolve(true);
+    const observer = new MutationObserver(() => {
+        if (cards() !== before) finish(true);
+    });
+    const timer = setTimeout(() => finish(false), stepTimeoutMs);
+    const finish = (ok) => {
+        observer.disconnect();
+        clearTimeout(timer);
+        resolve(ok);
+    };
+    observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+});
+
+(async () => {
+    let page = current() || 1;
+    while (page < target) {
+        const next = document.getElementById("pagination-right");
+        if (!next || next.disabled || next.className.includes("disabled")) break;
+        const before = cards();
+        next.click();
+        if (!await changed(before)) break;
+        page = current() || page + 1;
+    }
+    return page;
+})().then(done, () => done(null));
+"""
+
+PHONE_RE = re.compile(r'(\+?\d[\d\s().-]{7,}\d)')
+
+# What each card button's card shows: property code (data-ctyhocn or hotel
+# link), name, price and rating. Used for identity and change detection.
+CARD_INFO_JS = """
+const codeRe = /\\/hotels\\/([a-z0-9]{5,8})-/i;
+const text = (el) => el ? (el.innerText || "").trim() : "";
+return arguments[0].map(btn => {
+    const card = btn.closest("li, article") || btn.parentElement;
+    let code = null;
+    const tagged = btn.closest("[data-ctyhocn]") || card.querySelector("[data-ctyhocn]");
+    if (tagged) {
+        code = tagged.getAttribute("data-ctyhocn").toUpperCase();
+    } else {
+        for (const a of card.querySelectorAll("a[href]")) {
+            const m = a.href.match(codeRe);
+            if (m) { code = m[1].toUpperCase(); break; }
+        }
+    }
+    const rating = Array.from(card.querySelectorAll("p, span")).find(el => el.innerText.includes("Rating"));
+    return {
+        code: code,
+        name: text(card.querySelector("h2, h3")),
+        price: text(card.querySelector("[data-testid='rateItem']")),
+        rating: text(rating),
+    };
+});
+"""
+
+# Nearby and airport tab data without opening either tab. Panels already in
+# the DOM are read even while hidden (textContent, scoped to the popup);
+# lists whose panel React has not rendered yet come from the props of the
+# popup's components: its ancestors and its subtree.
+TAB_DATA_JS = """
+const tabData = (popup) => {
+    const clean = (s) => String(s == null ? "" : s).replace(/\\s+/g, " ").trim();
+    const nodes = (ctx, path) => {
+        const r = document.evaluate(path, ctx, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const out = [];
+        for (let i = 0; i < r.snapshotLength; i++) out.push(r.snapshotItem(i));
+        return out;
+    };
+    const first = (ctx, path) => clean((nodes(ctx, path)[0] || {}).textContent);
+
+    let nearby = nodes(popup, ".//*[@id='tab-panel-nearBy']//li")
+        .map(li => ({place: first(li, ".//div[1]/span"), distance: first(li, ".//div[2]")}))
+        .filter(n => n.place);
+    let airport = nodes(popup, ".//*[@id='tab-panel-airport']//li")
+        .map(li => ({
+            airport: first(li, ".//div[1]/div/span[last()]"),
+            distance: first(li, ".//div[1]/div[2]"),
+            shuttle: first(li, ".//p"),
+        }))
+        .filter(a => a.airport);
+    if (nearby.length && airport.length) return {nearby, airport};
+
+    const patterns = {
+        nearby: /^(nearby|nearbyAttractions|attractions|pointsOfInterest)$/i,
+        airport: /^airports?$/i,
+    };
+    const found = {};
+    const seen = new Set();
+    const visit = (value, depth) => {
+        if (!value || typeof value !== "object" || depth > 4 || seen.has(value) || value instanceof Node) return;
+        seen.add(value);
+        for (const [key, child] of Object.entries(value)) {
+            if (key === "children" || key.startsWith("_")) continue;
+            for (const [name, re] of Object.entries(patterns)) {
+                if (!found[name] && re.test(key) && Array.isArray(child) && child.some(c => c && c.name)) {
+                    found[name] = child;
+                }
+            }
+            visit(child, depth + 1);
+        }
+    };
+    const fiberKey = Object.keys(popup).find(k => k.startsWith("__reactFiber$"));
+    const root = fiberKey ? popup[fiberKey] : null;
+    for (let f = root, up = 0; f && up < 15; f = f.return, up++) visit(f.memoizedProps, 0);
+    const stack = root && root.child ? [root.child] : [];
+    for (let n = 0; stack.length && n < 2000 && !(found.nearby && found.airport); n++) {
+        const f = stack.pop();
+        visit(f.memoizedProps, 0);
+        if (f.sibling) stack.push(f.sibling);
+        if (f.child) stack.push(f.child);
+    }
+
+    if (!nearby.length) {
+        nearby = (found.nearby || [])
+            .map(n => ({place: clean(n.name), distance: clean(n.distanceFmt || n.distance)}))
+            .filter(n => n.place);
+    }
+    if (!airport.length) {
+        airport = (found.airport || [])
+            .map(a => ({
+                airport: clean(a.name),
+                distance: clean(a.distanceFmt || a.distance),
+                shuttle: a.shuttle || a.shuttleService ? "Airport shuttle" : "",
+            }))
+            .filter(a => a.airport);
+    }
+    return {nearby, airport};
+};
+"""
+
+POPUP_HTML_JS = TAB_DATA_JS + """
+const popup = arguments[0];
+const text = (ctx, xpath) => {
+    const el = document.evaluate(xpath, ctx, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    return el ? el.innerText.trim() : "";
+};
+return {
+    html: popup.outerHTML,
+    address: text(document, ".//span[@data-testid='locationMarker']"),
+    price: text(document, ".//span[@data-testid='rateItem']"),
+    name: text(popup, ".//h1 | .//h2"),
+    tabs: tabData(popup),
+};
+"""
+
+# Same XPaths as the parse_* helpers, evaluated inside the page.
+POPUP_EXTRACT_JS = TAB_DATA_JS + """
+const popup = arguments[0];
+const all = (ctx, path) => {
+    const r = document.evaluate(path, ctx, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const out = [];
+    for (let i = 0; i < r.snapshotLength; i++) out.push(r.snapshotItem(i));
+    return out;
+};
+const text = (el) => el ? (el.innerText || "").trim() : "";
+const first = (ctx, path) => text(all(ctx, path)[0]);
+
+const overview = {};
+for (const row of all(popup, ".//table//tr")) {
+    const th = all(row, ".//th")[0];
+    const td = all(row, ".//td")[0];
+    if (th && td) overview[text(th)] = text(td);
+}
+const amenities = all(popup, ".//ul[contains(@class,'peer flex')]/li")
+    .map(li => first(li, ".//span[@data-testid='hotelAmenityLabel']"))
+    .filter(Boolean);
+const tabs = tabData(popup);
+
+const link = Array.from(popup.querySelectorAll("a[href*='/hotels/']"))
+    .map(a => a.href.match(/\\/hotels\\/([a-z0-9]{5,8})-/i))
+    .find(Boolean);
+
+return {
+    ctyhocn: link ? link[1].toUpperCase() : null,
+    name: first(popup, ".//h1 | .//h2"),
+    rating: first(popup, ".//p[contains(text(),'Rating')]"),
+    description: first(popup, ".//div/p[@class='inline text-start md:block']"),
+    address: first(document, ".//span[@data-testid='locationMarker']"),
+    price: first(document, ".//span[@data-testid='rateItem']"),
+    overview: overview,
+    amenities: amenities,
+    nearby: tabs.nearby,
+    airport: tabs.airport,
+    all_text: text(popup),
+};
+"""
 
 
 # ================== UTILS ==================
 
-def make_options():
+def make_options(profile=None):
+    profile = profile or LAUNCH_PROFILE
     opts = uc.ChromeOptions()
-    opts.add_argument("--start-maximized")
+    if profile == "lean":
+        for arg in LEAN_CHROME_ARGS:
+            opts.add_argument(arg)
+        opts.add_argument(f"--window-size={LEAN_WINDOW_SIZE}")
+        opts.add_argument(f"--disk-cache-dir={CHROME_CACHE_DIR}")
+        opts.add_argument(f"--renderer-process-limit={LEAN_RENDERER_LIMIT}")
+    else:
+        opts.add_argument("--start-maximized")
     opts.add_argument("--disable-blink-features=AutomationControlled")
     opts.add_argument("--no-sandbox")
     opts.add_argument("--disable-dev-shm-usage")
+    if CAPTURE_MODE or BLOCK_RESOURCES:
+        enable_network_capture(opts)
     return opts
 
 
@@ -72,35 +482,271 @@ def extract_weight(text):
     return m.group(1) if m else ""
 
 
-def save_state(page_num):
-    with open(STATE_FILE, "w") as f:
-        json.dump({"last_page": page_num}, f)
+def save_state(state):
+    """Replace the checkpoint atomically (temp file + rename)."""
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, STATE_FILE)
 
 
 def load_state():
+    state = {"page": 1, "card": 0, "completed": [], "started": None}
     if os.path.exists(STATE_FILE):
         with open(STATE_FILE) as f:
             data = json.load(f)
-            return data.get("last_page", 1)
-    return 1
+        if "page" in data:
+            state.update(data)
+        else:
+            # Old page-only checkpoint
+            state["page"] = data.get("last_page", 1)
+    return state
 
 
-def wait_for_popup_content(driver, timeout=40):
-    start = time.time()
-    while True:
-        try:
-            popup = driver.find_element(
-                By.CSS_SELECTOR,
-                "div.relative.flex.size-full.flex-col.overflow-y-auto"
-            )
-            text_nodes = [e for e in popup.find_elements(By.XPATH, ".//*") if e.text.strip()]
-            if len(text_nodes) > 8:
-                return popup
-        except:
-            pass
-        if time.time() - start > timeout:
-            raise TimeoutException("Popup content did not load")
-        time.sleep(0.4)
+def migrate_csv_columns():
+    """Rewrite a CSV written with an older FIELDS list under the current header.
+
+    Columns added since (the typed pet-policy fields) are filled from the
+    row's pets_json, so appended rows line up with the header again.
+    """
+    with open(OUTPUT_FILE_CSV, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames == FIELDS:
+            return
+        rows = list(reader)
+    missing_pets = [row for row in rows if any(row.get(k) is None for k in PET_FIELDS)]
+    enrich_records(missing_pets)
+    tmp = OUTPUT_FILE_CSV + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, OUTPUT_FILE_CSV)
+    print(f"🔧 Migrated {OUTPUT_FILE_CSV} to the current columns ({len(rows)} rows)")
+
+
+def prepare_output_files():
+    if not os.path.exists(OUTPUT_FILE_CSV):
+        with open(OUTPUT_FILE_CSV, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+    else:
+        migrate_csv_columns()
+
+    if JSON_OUTPUT_MODE == "jsonl":
+        seed_jsonl()
+    elif not os.path.exists(OUTPUT_FILE_JSON):
+        with open(OUTPUT_FILE_JSON, "w", encoding="utf-8") as f:
+            json.dump([], f)
+
+
+def seed_jsonl():
+    # One-time migration: seed the JSONL sink from an existing JSON array
+    # so a later `compact` does not drop hotels scraped in array mode.
+    if not os.path.exists(OUTPUT_FILE_JSONL) and os.path.exists(OUTPUT_FILE_JSON):
+        with open(OUTPUT_FILE_JSON, encoding="utf-8") as jf:
+            existing = json.load(jf)
+        with open(OUTPUT_FILE_JSONL, "w", encoding="utf-8") as f:
+            for record in existing:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def append_jsonl(records, path=None):
+    if isinstance(records, dict):
+        records = [records]
+    with open(path or OUTPUT_FILE_JSONL, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+
+
+def read_jsonl(path=None):
+    path = path or OUTPUT_FILE_JSONL
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a truncated last line
+                print(f"⚠ Skipping malformed line in {path}")
+    return records
+
+
+def compact_jsonl(src=None, dst=None):
+    """Export the JSONL sink to the legacy JSON array format.
+
+    Incremental crawls append newer versions of a hotel; only the latest
+    line per hotel (see hilton_fields.hotel_key) is kept.
+    """
+    dst = dst or OUTPUT_FILE_JSON
+    if src is None:
+        seed_jsonl()
+    latest = {}
+    for record in read_jsonl(src):
+        key = hotel_key(record)
+        latest.pop(key, None)
+        latest[key] = record
+    records = list(latest.values())
+    if os.path.exists(dst):
+        with open(dst, encoding="utf-8") as f:
+            missing = {hotel_key(r) for r in json.load(f)} - set(latest)
+        if missing:
+            raise SystemExit(f"{len(missing)} hotels in {dst} are not in {src or OUTPUT_FILE_JSONL}; "
+                             f"refusing to overwrite it")
+    # Lines written before the typed pet-policy fields existed
+    enrich_records([r for r in records if PET_FIELDS[0] not in r])
+    tmp = dst + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, dst)
+    print(f"📦 Compacted {len(records)} hotels → {dst}")
+    return len(records)
+
+
+def read_sink_keys(since):
+    """hotel_code values the CSV and JSON sinks received since the crawl started."""
+    csv_keys = set()
+    if os.path.exists(OUTPUT_FILE_CSV):
+        with open(OUTPUT_FILE_CSV, newline="", encoding="utf-8") as f:
+            csv_keys = {
+                row["hotel_code"] for row in csv.DictReader(f)
+                if row.get("hotel_code") and (row.get("last_updated") or "") >= since
+            }
+
+    if JSON_OUTPUT_MODE == "jsonl":
+        json_records = read_jsonl()
+    elif os.path.exists(OUTPUT_FILE_JSON):
+        with open(OUTPUT_FILE_JSON, encoding="utf-8") as f:
+            json_records = json.load(f)
+    else:
+        json_records = []
+    json_keys = {r.get("hotel_code") for r in json_records if (r.get("last_updated") or "") >= since}
+    return csv_keys, json_keys
+
+
+class RecordWriter:
+    """Single writer for the CSV/JSON sinks and the SQLite store, with an exactly-once ledger.
+
+    A hotel key is written to a sink at most once per crawl (records the sink
+    received after the crawl started count as written), and the checkpoint
+    (page, next card, completed keys) is replaced atomically after every
+    record, so a crash resumes at the next hotel. finish() resets the
+    checkpoint so the next run starts a fresh crawl.
+
+    Commands that are not a resumable crawl pass ledger=False: records are
+    still written once per run, but the checkpoint is neither read nor saved.
+    """
+
+    def __init__(self, ledger=True):
+        self.ledger = ledger
+        self.files = STORAGE in ("files", "both")
+        if self.files:
+            prepare_output_files()
+        # Upserts are idempotent, so the store needs no per-crawl ledger
+        self.store = HotelStore(STORE_FILE) if STORAGE in ("sqlite", "both") else None
+        self.index = HotelIndex(INDEX_FILE)
+        self.state = load_state() if ledger else {"page": 1, "card": 0, "completed": [], "started": None}
+        if not self.state["started"]:
+            self.state["started"] = datetime.utcnow().isoformat()
+        self.completed = set(self.state["completed"])
+        resuming = self.files and ledger
+        self.csv_keys, self.json_keys = read_sink_keys(self.state["started"]) if resuming else (set(), set())
+        self.written = 0
+
+    def write(self, hotel_data, page=None, card=None, card_hash=None):
+        return self.write_many([(hotel_data, page, card, card_hash)]) == 1
+
+    def write_many(self, items):
+        """Write (record, page, card, card hash) items with one open per sink and one checkpoint.
+
+        Returns the number of records that were new.
+        """
+        fresh = []
+        for item in items:
+            key = item[0]["hotel_code"]
+            if key in self.completed:
+                print(f"⏭ Already saved: {key}")
+                continue
+            self.completed.add(key)
+            fresh.append(item)
+        if not fresh:
+            return 0
+
+        with metrics.span("write"):
+            if self.store is not None:
+                self.store.upsert_many("hilton", [(hotel_key(r), typed_record(r), r) for r, _, _, _ in fresh])
+            if self.files:
+                self.write_files([item[0] for item in fresh])
+
+            self.index.update_many([(hotel_data, card_hash) for hotel_data, _, _, card_hash in fresh])
+            self.written += len(fresh)
+            for _, page, card, _ in fresh:
+                if page is not None:
+                    self.state["page"] = page
+                    self.state["card"] = card + 1
+            self.checkpoint()
+        return len(fresh)
+
+    def write_files(self, records):
+        """Append to the CSV and JSON sinks, skipping keys a sink already has."""
+        csv_rows = [r for r in records if r["hotel_code"] not in self.csv_keys]
+        if csv_rows:
+            with open(OUTPUT_FILE_CSV, "a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDS)
+                writer.writerows(csv_rows)
+            self.csv_keys.update(r["hotel_code"] for r in csv_rows)
+
+        json_rows = [r for r in records if r["hotel_code"] not in self.json_keys]
+        if json_rows:
+            if JSON_OUTPUT_MODE == "jsonl":
+                append_jsonl(json_rows)
+            else:
+                with open(OUTPUT_FILE_JSON, "r+", encoding="utf-8") as jf:
+                    data = json.load(jf)
+                    data.extend(json_rows)
+                    jf.seek(0)
+                    json.dump(data, jf, ensure_ascii=False, indent=2)
+            self.json_keys.update(r["hotel_code"] for r in json_rows)
+
+    def page_done(self, page):
+        self.state["page"] = page + 1
+        self.state["card"] = 0
+        self.checkpoint()
+
+    def finish(self):
+        self.state = {"page": 1, "card": 0, "completed": [], "started": None}
+        save_state(self.state)
+
+    def checkpoint(self):
+        if not self.ledger:
+            return
+        self.state["completed"] = sorted(self.completed)
+        save_state(self.state)
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+        self.index.close()
+
+
+def wait_for_popup_content(driver, timeout=POPUP_TIMEOUT):
+    """Block until the hotel popup's table/amenity sections are populated.
+
+    The wait runs inside the browser (MutationObserver), so it costs one
+    WebDriver round-trip however long the popup takes to render.
+    """
+    # Leave headroom so the browser-side timer fires first
+    ensure_script_timeout(driver, timeout + 5)
+    popup = driver.execute_async_script(POPUP_READY_JS, POPUP_SELECTOR, int(timeout * 1000))
+    if popup is None:
+        raise TimeoutException(f"Popup content did not load within {timeout}s")
+    return popup
 
 
 def safe_find_text(el, xpath):
@@ -141,217 +787,952 @@ def parse_amenities(popup):
     return amenities
 
 
-def parse_nearby(popup):
-    data = []
+def parse_tabs(popup):
+    """Nearby and airport lists in one round-trip, without opening either tab."""
     try:
-        items = popup.find_elements(By.XPATH, "//*[@id='tab-panel-nearBy']//li")
-        for item in items:
-            try:
-                place = safe_find_text(item, ".//div[1]/span")
-                distance = safe_find_text(item, ".//div[2]")
-                if place:
-                    data.append({"place": place, "distance": distance})
-            except:
-                continue
-    except:
+        return popup.parent.execute_script(TAB_DATA_JS + "return tabData(arguments[0]);", popup)
+    except Exception:
+        return {"nearby": [], "airport": []}
+
+
+def find_ctyhocn(el):
+    try:
+        for a in el.find_elements(By.CSS_SELECTOR, "a[href*='/hotels/']"):
+            m = CTYHOCN_RE.search(a.get_attribute("href") or "")
+            if m:
+                return m.group(1).upper()
+    except Exception:
         pass
-    return data
+    return None
 
 
-def parse_airport_info(popup):
-    data = []
+def card_info(driver, buttons):
+    """Code and card fingerprint for all card buttons on the page in one round-trip."""
     try:
-        # Click "Airport info" button
-        btn = popup.find_element(By.XPATH, "//*[@id='airport']")
-        btn.click()
-        time.sleep(1)
-        items = popup.find_elements(By.XPATH, "//*[@id='tab-panel-airport']//li")
-        for item in items:
+        cards = driver.execute_script(CARD_INFO_JS, buttons)
+    except Exception:
+        cards = None
+    if not cards or len(cards) != len(buttons):
+        cards = [{} for _ in buttons]
+    for card in cards:
+        card["fingerprint"] = card_fingerprint(card.get("name"), card.get("price"), card.get("rating"))
+    return cards
+
+
+def extract_popup_selenium(driver, popup):
+    tabs = parse_tabs(popup)
+    all_text = "\n".join(
+        e.text.strip()
+        for e in popup.find_elements(By.XPATH, ".//*")
+        if e.text.strip()
+    )
+    return {
+        "ctyhocn": find_ctyhocn(popup),
+        "name": safe_find_text(popup, ".//h1 | .//h2"),
+        "rating": safe_find_text(popup, ".//p[contains(text(),'Rating')]"),
+        "description": safe_find_text(popup, ".//div/p[@class='inline text-start md:block']"),
+        "address": safe_find_text(driver, ".//span[@data-testid='locationMarker']"),
+        "price": safe_find_text(driver, ".//span[@data-testid='rateItem']"),
+        "overview": parse_overview_table(popup),
+        "amenities": parse_amenities(popup),
+        "nearby": tabs["nearby"],
+        "airport": tabs["airport"],
+        "all_text": all_text,
+    }
+
+
+def extract_popup_js(driver, popup):
+    try:
+        details = driver.execute_script(POPUP_EXTRACT_JS, popup)
+    except Exception as e:
+        print(f"⚠ JS extraction failed: {e}")
+        return None
+    if not details or not details.get("name"):
+        return None
+    return details
+
+
+def capture_popup_html(driver, popup):
+    """The popup's outerHTML snapshot, plus the tab lists in case their panels are not in it."""
+    try:
+        snapshot = driver.execute_script(POPUP_HTML_JS, popup)
+    except Exception as e:
+        print(f"⚠ HTML capture failed: {e}")
+        return None
+    if not snapshot or not snapshot.pop("name"):
+        return None
+    return snapshot
+
+
+def capture_popup(driver, popup):
+    """Everything the browser has to do for a popup; parse_popup() finishes the job off-thread.
+
+    Returns {"snapshot": ...} in html mode, otherwise {"details": ...}.
+    """
+    if EXTRACT_MODE == "html":
+        snapshot = capture_popup_html(driver, popup)
+        if snapshot:
+            return {"snapshot": snapshot}
+    elif EXTRACT_MODE == "js":
+        details = extract_popup_js(driver, popup)
+        if details:
+            return {"details": details}
+    if EXTRACT_MODE != "selenium":
+        print("↩ Falling back to Selenium locators")
+    return {"details": extract_popup_selenium(driver, popup)}
+
+
+def parse_popup(payload):
+    if "details" in payload:
+        return payload["details"]
+    from hilton_html import parse_snapshot, save_snapshot
+
+    details = parse_snapshot(payload["snapshot"])
+    if HTML_DIR:
+        save_snapshot(HTML_DIR, details.get("ctyhocn") or datetime.utcnow().strftime("%Y%m%d%H%M%S%f"),
+                      payload["snapshot"])
+    return details
+
+
+def build_record(item):
+    """Record for an item yielded by scrape_page()."""
+    with metrics.span("parse"):
+        details = parse_popup(item)
+        code = item.get("code") or details.get("ctyhocn") or item["fallback_code"]
+        hotel_data = build_hotel_record(code, details)
+    print(f"✅ Extracted: {hotel_data['hotel_name']}")
+    return hotel_data
+
+
+def build_hotel_record(hotel_code, details):
+    overview = details.get("overview") or {}
+    all_text = details.get("all_text") or ""
+
+    pets_json = {}
+    parking_json = {}
+    for k, v in overview.items():
+        if "pet" in k.lower():
+            pets_json[k] = v
+        if "park" in k.lower():
+            parking_json[k] = v
+
+    phone = details.get("phone") or ""
+    if not phone:
+        match = PHONE_RE.search(all_text)
+        phone = match.group(1) if match else ""
+    return {
+        "hotel_code": hotel_code,
+        "hotel_name": details.get("name") or "UNKNOWN",
+        "address": details.get("address") or "",
+        "phone": phone,
+        "rating": details.get("rating") or "",
+        "description": details.get("description") or "",
+        "card_price": details.get("price") or "",
+        "overview_table_json": json.dumps(overview, ensure_ascii=False),
+        "pets_json": json.dumps(pets_json, ensure_ascii=False),
+        "parking_json": json.dumps(parking_json, ensure_ascii=False),
+        "amenities_json": json.dumps(details.get("amenities") or [], ensure_ascii=False),
+        "nearby_json": json.dumps(details.get("nearby") or [], ensure_ascii=False),
+        "airport_json": json.dumps(details.get("airport") or [], ensure_ascii=False),
+        "is_pet_friendly": "true" if "pet" in all_text.lower() else "false",
+        **parse_pet_policy(" ".join(str(v) for v in pets_json.values())),
+        "last_updated": datetime.utcnow().isoformat()
+    }
+
+
+class CommandBudgetExceeded(RuntimeError):
+    pass
+
+
+# Frames from these packages are skipped when attributing a command
+DRIVER_MODULES = ("selenium", "undetected_chromedriver")
+
+
+def call_site():
+    """'file:line function ← caller' of the code that issued a WebDriver command."""
+    frame = sys._getframe(2)
+    while frame and frame.f_globals.get("__name__", "").startswith(DRIVER_MODULES):
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    site = f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+    caller = frame.f_back
+    if caller is not None:
+        site += f" ← {caller.f_code.co_name}:{caller.f_lineno}"
+    return site
+
+
+class CommandCounter:
+    """Counts and times WebDriver commands sent by a driver and its elements.
+
+    Each command is attributed to its call site (first frame outside
+    Selenium, plus that frame's caller), so report() shows which helpers
+    are chatty. With a per-hotel `budget`, a hotel that needs more commands
+    is reported ("warn") or stops the crawl with CommandBudgetExceeded
+    ("fail"). Also keeps each hotel's wall time, from start_hotel() to
+    record_hotel().
+    """
+
+    def __init__(self, budget=None, budget_action="warn"):
+        self.budget = budget
+        self.budget_action = budget_action
+        self.count = 0
+        self.total = 0
+        self.hotels = 0
+        self.errors = 0
+        self.over_budget = 0
+        self.latencies = []
+        self.in_hotel = False
+        self.hotel_started = time.perf_counter()
+        self.sites = {}
+        self.hotel_sites = Counter()
+
+    def attach(self, driver):
+        # WebElement calls go through driver.execute as well
+        execute = driver.execute
+
+        def counting_execute(driver_command, *args, **kwargs):
+            site = call_site()
+            if (self.in_hotel and self.budget is not None and self.budget_action == "fail"
+                    and self.count >= self.budget):
+                raise CommandBudgetExceeded(
+                    f"{driver_command} from {site} would exceed the budget of {self.budget} commands per hotel"
+                )
+            started = time.perf_counter()
             try:
-                name = safe_find_text(item, ".//div[1]/div/span[last()]")
-                distance = safe_find_text(item, ".//div[1]/div[2]")
-                shuttle = safe_find_text(item, ".//p")
-                if name:
-                    data.append({"airport": name, "distance": distance, "shuttle": shuttle})
-            except:
-                continue
-    except:
-        pass
-    return data
+                return execute(driver_command, *args, **kwargs)
+            finally:
+                self.record_command(site, driver_command, time.perf_counter() - started)
 
+        driver.execute = counting_execute
 
-def retry_action(action, retries=RETRY_LIMIT, delay=2):
-    for i in range(retries):
-        try:
-            return action()
-        except Exception as e:
-            print(f"⚠ Retry {i+1}/{retries}: {e}")
-            time.sleep(delay)
-    raise Exception("Max retries exceeded")
+    def record_command(self, site, command, seconds):
+        self.count += 1
+        stats = self.sites.get((site, command))
+        if stats is None:
+            stats = self.sites[(site, command)] = [0, 0.0]
+        stats[0] += 1
+        stats[1] += seconds
+        if self.in_hotel:
+            self.hotel_sites[site] += 1
+        metrics.inc("webdriver_commands", command=command)
 
+    def reset(self):
+        used = self.count
+        self.count = 0
+        return used
 
-# ================== MAIN SCRAPER ==================
+    def start_hotel(self):
+        self.reset()
+        self.hotel_sites.clear()
+        self.in_hotel = True
+        self.hotel_started = time.perf_counter()
 
-def main():
-    start_page = load_state()
-    print(f"🔄 Resuming from page {start_page}")
+    def record_hotel(self):
+        self.latencies.append(time.perf_counter() - self.hotel_started)
+        self.in_hotel = False
+        used = self.reset()
+        self.total += used
+        self.hotels += 1
+        if self.budget is not None and used > self.budget:
+            self.over_budget += 1
+            top = ", ".join(f"{site} ×{n}" for site, n in self.hotel_sites.most_common(3))
+            print(f"💸 {used} WebDriver commands > budget {self.budget}: {top}")
+        return used
 
-    driver = uc.Chrome(options=make_options(), use_subprocess=True)
-    wait = WebDriverWait(driver, 60)
-    hotels = []
-    page = start_page
+    def record_error(self):
+        self.in_hotel = False
+        self.reset()
+        self.errors += 1
 
-    # Prepare files
-    if not os.path.exists(OUTPUT_FILE_CSV):
-        with open(OUTPUT_FILE_CSV, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=FIELDS)
-            writer.writeheader()
+    def average(self):
+        return self.total / self.hotels if self.hotels else 0.0
+
+    def top_sites(self, limit=10):
+        """Most expensive call sites by total time: (site, command, calls, seconds)."""
+        rows = [(site, command, calls, seconds) for (site, command), (calls, seconds) in self.sites.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)[:limit]
+
+    def report(self, limit=10):
+        lines = [f"🧾 Most expensive WebDriver call sites ({self.hotels} hotels, {self.over_budget} over budget):"]
+        for site, command, calls, seconds in self.top_sites(limit):
+            per_hotel = f", {calls / self.hotels:.1f}/hotel" if self.hotels else ""
+            lines.append(f"   {seconds:7.2f}s {calls:6d}× {command:<22} {site}{per_hotel}")
+        return "\n".join(lines)
 
-    if not os.path.exists(OUTPUT_FILE_JSON):
-        with open(OUTPUT_FILE_JSON, "w", encoding="utf-8") as f:
-            json.dump([], f)
 
+def read_captured_hotels(capture):
+    payloads = capture.drain()
+    if CAPTURE_DIR and payloads:
+        save_payloads(payloads, CAPTURE_DIR, CAPTURE_PREFIX)
+    return hotels_from_payloads(payloads)
+
+
+def replay_capture(directory):
+    """Build records offline from responses saved with --capture-dir."""
+    writer = RecordWriter(ledger=False)
+    for details in hotels_from_payloads(load_payloads(directory)):
+        writer.write(build_hotel_record(details["ctyhocn"], details))
+    writer.close()
+    print(f"📼 Replayed {writer.written} hotels from {directory}")
+    return writer.written
+
+
+def bootstrap_session():
+    """Open Chrome once to obtain the cookies/headers the HTTP backend needs."""
+    driver = uc.Chrome(options=make_options(), use_subprocess=True)
     try:
         driver.get(START_URL)
+        WebDriverWait(driver, 60).until(lambda d: d.execute_script("return document.readyState") == "complete")
+        cookies = {c["name"]: c["value"] for c in driver.get_cookies()}
+        headers = {"User-Agent": driver.execute_script("return navigator.userAgent")}
+        return cookies, headers
+    finally:
+        driver.quit()
+
+
+def http_main():
+    """Scrape over HTTP without a browser; Chrome is only used to refresh cookies."""
+    from hilton_http import crawl as http_crawl
+
+    if not CAPTURE_DIR:
+        raise SystemExit("The http backend needs --capture-dir with recorded requests")
+    writer = RecordWriter(ledger=False)
+    hotels = http_crawl(
+        CAPTURE_DIR,
+        base_url=HTTP_BASE_URL or None,
+        concurrency=HTTP_CONCURRENCY,
+        bootstrap=bootstrap_session,
+    )
+    for details in hotels:
+        writer.write(build_hotel_record(details["ctyhocn"], details))
+    writer.close()
+    print(f"\n🎉 DONE — Fetched {len(hotels)} hotels over HTTP ({writer.written} new).")
+    return writer.written
+
+
+def export_parquet(dst=None):
+    """Write the JSON sink's latest records to Parquet (see hilton_parquet.py)."""
+    from hilton_parquet import write_parquet
+
+    dst = dst or OUTPUT_FILE_PARQUET
+    # The JSON array is the only sink of crawls made before (or without) jsonl mode
+    src = OUTPUT_FILE_JSONL if JSON_OUTPUT_MODE == "jsonl" and os.path.exists(OUTPUT_FILE_JSONL) else OUTPUT_FILE_JSON
+    if src == OUTPUT_FILE_JSONL:
+        records = read_jsonl()
+    else:
+        records = read_records(src) if os.path.exists(src) else []
+    if not records:
+        raise SystemExit(f"No records in {src}; nothing to export")
+    started = time.perf_counter()
+    count = write_parquet(records, dst)
+    print(f"🧱 Exported {count} hotels → {dst} in {time.perf_counter() - started:.2f}s")
+    return count
+
+
+def reparse_html(directory):
+    """Rebuild records from popup snapshots saved with --html-dir."""
+    from hilton_html import reparse_directory
+
+    writer = RecordWriter(ledger=False)
+    started = time.perf_counter()
+    for name, details in reparse_directory(directory):
+        writer.write(build_hotel_record(details.get("ctyhocn") or name, details))
+    writer.close()
+    elapsed = time.perf_counter() - started
+    print(f"🧾 Re-parsed {writer.written} hotels from {directory} in {elapsed:.2f}s")
+    return writer.written
+
+
+# ================== MAIN SCRAPER ==================
+
+def start_pipeline(writer):
+    if not PIPELINE:
+        return None
+    return Pipeline(build_record, writer.write_many, writer.page_done, PARSE_WORKERS, PIPELINE_QUEUE_SIZE,
+                    WRITE_BATCH_SIZE)
+
+
+def start_browser(profile=None):
+    profile = profile or LAUNCH_PROFILE
+    # uc's headless mode uses --headless=new and hides the HeadlessChrome UA
+    driver = uc.Chrome(options=make_options(profile), use_subprocess=True, headless=profile == "lean")
+    driver.resource_filter = None
+    if BLOCK_RESOURCES:
+        policy = ResourcePolicy(BLOCK_TYPES, BLOCK_DOMAINS, ALLOW_DOMAINS)
+        driver.resource_filter = SeleniumResourceFilter(driver, policy).install()
+    return driver, WebDriverWait(driver, 60)
+
+
+def network_capture(driver):
+    """Performance-log reader for capture mode and/or the resource filter's stats."""
+    if not (CAPTURE_MODE or driver.resource_filter):
+        return None
+    listeners = [driver.resource_filter.observe] if driver.resource_filter else []
+    return NetworkCapture(driver, fetch_bodies=CAPTURE_MODE, listeners=listeners)
+
+
+def report_resources(driver, capture, label):
+    if not driver.resource_filter:
+        return
+    if capture:
+        # Pull the latest events into the filter's counters; responses drained
+        # here are still saved to --capture-dir
+        read_captured_hotels(capture)
+    print(driver.resource_filter.page_report(label))
+
+
+def page_url(page):
+    if page <= 1:
+        return START_URL
+    return f"{START_URL}?{PAGE_URL_PARAM}={page}"
+
+
+def load_results(driver, wait, url):
+    with metrics.span("page_load"):
+        driver.get(url)
         wait.until(lambda d: d.execute_script("return document.readyState") == "complete")
-        time.sleep(3)
+        if not wait_for(driver, CARDS_READY):
+            metrics.inc("timeouts", stage="page_load")
+            print("⚠ No hotel cards rendered")
+    Pacer(PACING_PROFILE).pause("page")
 
-        # Jump to last saved page
-        for p in range(1, start_page):
-            try:
-                btn_next = driver.find_element(By.ID, "pagination-right")
-                driver.execute_script("arguments[0].click();", btn_next)
-                time.sleep(3)
-            except:
-                break
 
-        while True:
-            print(f"📄 Scraping page {page}...")
+def open_results_page(driver, wait, page):
+    """Open results page `page` directly. Returns False if the pager ends before it."""
+    load_results(driver, wait, page_url(page))
+    if page <= 1:
+        return True
+
+    current = driver.execute_script(CURRENT_PAGE_JS)
+    if current == page:
+        return True
+    if current is None:
+        # The pager cannot tell where the URL landed; start from a known page 1
+        print(f"↪ Current page unknown, driving the pager from page 1 to page {page}")
+        load_results(driver, wait, START_URL)
+    else:
+        print(f"↪ URL landed on page {current}, driving the pager to page {page}")
+    ensure_script_timeout(driver, PAGER_STEP_TIMEOUT * page + 5)
+    with metrics.span("pager_jump"):
+        reached = driver.execute_async_script(PAGER_JUMP_JS, page, PAGER_STEP_TIMEOUT * 1000)
+    return reached == page
+
 
-            # Find hotel cards
-            buttons = driver.find_elements(By.XPATH, "//button[.//span[normalize-space()='View hotel details']]")
+def scrape_page(driver, page, counter, capture=None, start_card=0, done=(), known=None):
+    """Yield (card index, item, card fingerprint) for every hotel on the open results page.
 
-            for i, btn in enumerate(buttons):
+    Items hold only what had to be read from the browser; build_record()
+    turns one into a record without touching the driver.
+
+    Cards before `start_card` and hotels whose key is in `done` are skipped
+    without opening their popup. When `known` (index entries) is given, so
+    are hotels whose card is unchanged and not older than STALE_DAYS.
+    """
+    if capture is not None and not capture.fetch_bodies:
+        # Only the resource filter reads the log; report_resources() drains it once per page
+        capture = None
+    captured = read_captured_hotels(capture) if capture else []
+    # Listing responses may only carry card fields; such hotels still get their popup opened
+    complete = {details["ctyhocn"]: details for details in captured if has_details(details)}
+    if captured:
+        print(f"📡 Page {page}: {len(complete)}/{len(captured)} captured hotels have detail data")
+
+    # Find hotel cards
+    buttons = driver.find_elements(By.XPATH, "//button[.//span[normalize-space()='View hotel details']]")
+    cards = card_info(driver, buttons)
+    pacer = Pacer(PACING_PROFILE)
+    popup_open = False
+
+    for i, btn in enumerate(buttons):
+        code = cards[i].get("code")
+        if i < start_card or (code or f"HILTON-{page}-{i+1}") in done:
+            continue
+        if known is not None and code and not needs_refresh(known.get(code), cards[i]["fingerprint"], STALE_DAYS):
+            print(f"⏭ Unchanged: {cards[i].get('name') or code}")
+            continue
+        if code in complete:
+            yield i, {"code": code, "details": complete[code]}, cards[i]["fingerprint"]
+            continue
+        if popup_open:
+            # The previous popup is still up; extracting now would read it under this card's code
+            popup_open = not close_popup(driver)
+            if popup_open:
+                print(f"⚠ Popup did not close; skipping {cards[i].get('name') or code or f'card {i + 1}'}")
+                continue
+        counter.start_hotel()
+        try:
+            with metrics.span("click"):
+                driver.execute_script("arguments[0].scrollIntoView({block:'center'});", btn)
+                pacer.pause("click")
                 try:
-                    driver.execute_script("arguments[0].scrollIntoView({block:'center'});", btn)
-                    time.sleep(0.5)
+                    btn.click()
+                except Exception:
+                    metrics.inc("retries", stage="click")
                     try:
-                        btn.click()
+                        driver.execute_script("arguments[0].click();", btn)
                     except Exception:
-                        try:
-                            driver.execute_script("arguments[0].click();", btn)
-                        except Exception:
-                            time.sleep(0.8)
-                            driver.execute_script("arguments[0].click();", btn)
-
-                    popup = retry_action(lambda: wait_for_popup_content(driver))
-                    all_text = "\n".join(
-                        e.text.strip()
-                        for e in popup.find_elements(By.XPATH, ".//*")
-                        if e.text.strip()
-                    )
-
-                    # Extracting Details
-                    name = safe_find_text(popup, ".//h1 | .//h2") or "UNKNOWN"
-                    rating = safe_find_text(popup, ".//p[contains(text(),'Rating')]")
-                    description = safe_find_text(popup, ".//div/p[@class='inline text-start md:block']")
-                    address = safe_find_text(driver, ".//span[@data-testid='locationMarker']")
-                    price = safe_find_text(driver, ".//span[@data-testid='rateItem']")
-
-                    overview = parse_overview_table(popup)
-                    amenities = parse_amenities(popup)
-                    nearby = parse_nearby(popup)
-                    airport = parse_airport_info(popup)
-
-                    pets_json = {}
-                    parking_json = {}
-                    for k, v in overview.items():
-                        if "pet" in k.lower():
-                            pets_json[k] = v
-                        if "park" in k.lower():
-                            parking_json[k] = v
-
-                    hotel_data = {
-                        "hotel_code": f"HILTON-{page}-{i+1}",
-                        "hotel_name": name,
-                        "address": address,
-                        "phone": re.search(r'(\+?\d[\d\s().-]{7,}\d)', all_text).group(1)
-                                   if re.search(r'(\+?\d[\d\s().-]{7,}\d)', all_text) else "",
-                        "rating": rating,
-                        "description": description,
-                        "card_price": price,
-                        "overview_table_json": json.dumps(overview, ensure_ascii=False),
-                        "pets_json": json.dumps(pets_json, ensure_ascii=False),
-                        "parking_json": json.dumps(parking_json, ensure_ascii=False),
-                        "amenities_json": json.dumps(amenities, ensure_ascii=False),
-                        "nearby_json": json.dumps(nearby, ensure_ascii=False),
-                        "airport_json": json.dumps(airport, ensure_ascii=False),
-                        "is_pet_friendly": "true" if "pet" in all_text.lower() else "false",
-                        "last_updated": datetime.utcnow().isoformat()
-                    }
-
-                    hotels.append(hotel_data)
-                    print(f"✅ Extracted: {hotel_data['hotel_name']}")
-
-                    # Save incrementally
-                    with open(OUTPUT_FILE_CSV, "a", newline="", encoding="utf-8") as f:
-                        writer = csv.DictWriter(f, fieldnames=FIELDS)
-                        writer.writerow(hotel_data)
-
-                    # JSON incremental save
-                    with open(OUTPUT_FILE_JSON, "r+", encoding="utf-8") as jf:
-                        data = json.load(jf)
-                        data.append(hotel_data)
-                        jf.seek(0)
-                        json.dump(data, jf, ensure_ascii=False, indent=2)
-
-                    popup.send_keys(Keys.ESCAPE)
-                    time.sleep(1)
+                        wait_for(driver, CLICKABLE, btn, timeout=3)
+                        driver.execute_script("arguments[0].click();", btn)
 
-                except Exception:
-                    try:
-                        driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ESCAPE)
-                    except:
-                        pass
-                    continue
+            with metrics.span("popup_wait"):
+                popup = wait_for_popup_content(driver)
+            with metrics.span("capture"):
+                popup_hotels = read_captured_hotels(capture) if capture else []
+                # Responses can hold several hotels or arrive late; only trust the clicked one
+                details = next((d for d in popup_hotels if code and d["ctyhocn"] == code), None)
+                if details:
+                    item = {"code": code, "details": details}
+                else:
+                    item = capture_popup(driver, popup)
+                    item.update(code=code, fallback_code=f"HILTON-{page}-{i+1}")
+            yield i, item, cards[i]["fingerprint"]
 
-            # Save state after each page
-            save_state(page)
+            with metrics.span("close"):
+                popup_open = not close_popup(driver, popup)
+            used = counter.record_hotel()
+            metrics.inc("hotels")
+            metrics.observe("hotel_seconds", counter.latencies[-1])
+            print(f"🔢 WebDriver commands ({EXTRACT_MODE}): {used}")
+            pacer.pause("close")
 
-            # Restart browser every 5 pages
-            if page % 2 == 0:
-                print(f"🔄 Restarting browser after {page} pages...")
-                driver.quit()
-                driver = uc.Chrome(options=make_options(), use_subprocess=True)
-                wait = WebDriverWait(driver, 60)
-                driver.get(START_URL)
-                for p in range(1, page):
-                    try:
-                        btn_next = driver.find_element(By.ID, "pagination-right")
-                        driver.execute_script("arguments[0].click();", btn_next)
-                        time.sleep(3)
-                    except:
-                        break
+        except CommandBudgetExceeded:
+            raise
+        except TimeoutException:
+            counter.record_error()
+            metrics.inc("timeouts", stage="popup_wait")
+            popup_open = not close_popup(driver)
+        except Exception as e:
+            counter.record_error()
+            metrics.inc("swallowed_exceptions", stage="hotel", type=type(e).__name__)
+            popup_open = not close_popup(driver)
+
+
+def close_popup(driver, popup=None):
+    """Press Escape (on the popup, then on the page) until the modal is gone; False if it stays open.
+
+    Every Escape is followed by a wait for MODAL_CLOSED, so the next click
+    cannot find the previous hotel's popup still rendered.
+    """
+    for target in (popup, None):
+        try:
+            (target or driver.find_element(By.TAG_NAME, "body")).send_keys(Keys.ESCAPE)
+        except Exception:
+            metrics.inc("swallowed_exceptions", stage="close", type="escape")
+        if wait_for(driver, MODAL_CLOSED, POPUP_SELECTOR, timeout=5):
+            return True
+        metrics.inc("timeouts", stage="close")
+    return False
+
+
+def browser_health():
+    return BrowserHealth(MAX_JS_HEAP_MB, MAX_DOM_NODES, MAX_RSS_MB, MAX_ERROR_RATE)
+
+
+def is_last_page(driver):
+    try:
+        btn_next = driver.find_element(By.ID, "pagination-right")
+    except NoSuchElementException:
+        return True
+    return "disabled" in (btn_next.get_attribute("class") or "")
+
+
+def main(counter=None):
+    writer = RecordWriter()
+    start_page = writer.state["page"]
+    card = writer.state["card"]
+    print(f"🔄 Resuming from page {start_page}, card {card + 1}")
+
+    driver, wait = start_browser()
+    counter = counter or CommandCounter(COMMAND_BUDGET, BUDGET_ACTION)
+    counter.attach(driver)
+    capture = network_capture(driver)
+    health = browser_health()
+    pipeline = start_pipeline(writer)
+    page = start_page
+
+    try:
+        # Jump to last saved page
+        if not open_results_page(driver, wait, start_page):
+            print("✅ Checkpoint is past the last page; starting over next run.")
+            writer.finish()
+            return
+
+        while True:
+            print(f"📄 Scraping page {page}...")
+
+            known = writer.index.entries if INCREMENTAL else None
+            for i, item, card_hash in scrape_page(
+                driver, page, counter, capture, card, writer.completed, known
+            ):
+                # Save incrementally; the checkpoint moves past this card
+                if pipeline:
+                    pipeline.submit(item, (page, i, card_hash))
+                else:
+                    writer.write(build_record(item), page, i, card_hash)
+
+            if pipeline:
+                pipeline.mark(page)
+                print(pipeline.report())
+                for name, stage in pipeline.snapshot()["stages"].items():
+                    metrics.set("queue_depth", stage["queue"], stage=name)
+            else:
+                writer.page_done(page)
+            metrics.inc("pages")
+            card = 0
+            report_resources(driver, capture, f"Page {page}")
+
+            # Restart the browser only when it is degrading
+            with metrics.span("health_check"):
+                recycle, _, _ = health.check(driver, counter)
+            if recycle:
+                print(f"🔄 Restarting browser after page {page}...")
+                with metrics.span("browser_restart"):
+                    driver.quit()
+                    driver, wait = start_browser()
+                    counter.attach(driver)
+                    health.reset(counter)
+                    capture = network_capture(driver)
+                    open_results_page(driver, wait, page)
+                metrics.inc("browser_restarts")
 
             # Pagination
-            try:
+            if is_last_page(driver):
+                print("✅ No more pages.")
+                if pipeline:
+                    pipeline.close()
+                    print(pipeline.report())
+                    pipeline = None
+                writer.finish()
+                break
+            print("➡️ Moving to next page...")
+            with metrics.span("paginate"):
+                before = card_signature(driver)
                 btn_next = driver.find_element(By.ID, "pagination-right")
-                if "disabled" in btn_next.get_attribute("class"):
-                    print("✅ No more pages.")
-                    break
-                print("➡️ Moving to next page...")
                 driver.execute_script("arguments[0].click();", btn_next)
                 page += 1
-                time.sleep(4)
-            except NoSuchElementException:
-                print("✅ All pages scraped.")
-                break
+                if not wait_for(driver, CARDS_CHANGED, before):
+                    metrics.inc("timeouts", stage="paginate")
+                    print("⚠ Card list did not change after moving to the next page")
+            Pacer(PACING_PROFILE).pause("page")
 
     finally:
         driver.quit()
-        print(f"\n🎉 DONE — Scraped {len(hotels)} hotels total.")
-        save_state(page)
+        try:
+            if pipeline:
+                # Write whatever was already captured before stopping; re-raises a parse failure
+                pipeline.close()
+                print(pipeline.report())
+        finally:
+            print(f"\n🎉 DONE — Scraped {writer.written} hotels total.")
+            if counter.hotels:
+                print(f"📊 Avg WebDriver commands per hotel ({EXTRACT_MODE}): {counter.average():.1f}")
+                print(counter.report())
+            writer.close()
+
+
+# ================== WORKER POOL ==================
+
+def worker_settings():
+    """Module settings a worker process needs (spawned workers do not see CLI overrides)."""
+    names = ("EXTRACT_MODE", "HTML_DIR", "CAPTURE_MODE", "CAPTURE_DIR", "INCREMENTAL", "STALE_DAYS", "PACING_PROFILE",
+             "MAX_JS_HEAP_MB", "MAX_DOM_NODES", "MAX_RSS_MB", "MAX_ERROR_RATE",
+             "BLOCK_RESOURCES", "BLOCK_TYPES", "BLOCK_DOMAINS", "ALLOW_DOMAINS", "LAUNCH_PROFILE",
+             "COMMAND_BUDGET", "BUDGET_ACTION")
+    return {name: globals()[name] for name in names}
+
+
+def pool_worker(worker_id, settings, done, known, next_page, last_page, lock, results, stop):
+    """Claim page numbers until the pager runs out (or the writer stops), sending records to the writer."""
+    globals().update(settings, CAPTURE_PREFIX=f"{worker_id}-")
+    # Forked workers inherit the parent's registry and exporters; only the writer reports
+    metrics.enabled = False
+    # undetected-chromedriver patches its binary on start; avoid racing on it
+    time.sleep(worker_id * WORKER_STAGGER)
+
+    driver = counter = None
+    try:
+        driver, wait = start_browser()
+        counter = CommandCounter(COMMAND_BUDGET, BUDGET_ACTION)
+        counter.attach(driver)
+        health = browser_health()
+        while True:
+            with lock:
+                page = next_page.value
+                if stop.is_set() or (last_page.value and page > last_page.value):
+                    break
+                next_page.value += 1
+
+            capture = network_capture(driver)
+            if not open_results_page(driver, wait, page):
+                with lock:
+                    if not last_page.value or page - 1 < last_page.value:
+                        last_page.value = page - 1
+                break
+
+            print(f"📄 [worker {worker_id}] Scraping page {page}...")
+            for _, item, card_hash in scrape_page(driver, page, counter, capture, done=done, known=known):
+                results.put(("record", (build_record(item), card_hash)))
+            results.put(("page", page))
+            report_resources(driver, capture, f"[worker {worker_id}] Page {page}")
+
+            if is_last_page(driver):
+                with lock:
+                    if not last_page.value or page < last_page.value:
+                        last_page.value = page
+
+            recycle, _, _ = health.check(driver, counter)
+            if recycle:
+                print(f"🔄 [worker {worker_id}] Restarting browser after page {page}...")
+                driver.quit()
+                driver, wait = start_browser()
+                counter.attach(driver)
+                health.reset(counter)
+    except Exception as e:
+        print(f"❌ [worker {worker_id}] {e}")
+    finally:
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        if counter is not None and counter.hotels:
+            print(f"[worker {worker_id}] {counter.report()}")
+        results.put(("done", worker_id))
+
+
+def pool_main(workers=WORKERS):
+    """Shard result pages across `workers` Chrome processes with a single writer."""
+    writer = RecordWriter()
+    start_page = writer.state["page"]
+    print(f"🔄 Starting {workers} workers from page {start_page}")
+
+    next_page = multiprocessing.Value("i", start_page)
+    last_page = multiprocessing.Value("i", 0)
+    lock = multiprocessing.Lock()
+    stop = multiprocessing.Event()
+    results = multiprocessing.Queue(maxsize=1000)
+    settings = worker_settings()
+    known = dict(writer.index.entries) if INCREMENTAL else None
+    procs = [
+        multiprocessing.Process(
+            target=pool_worker,
+            args=(n, settings, frozenset(writer.completed), known, next_page, last_page, lock, results, stop),
+        )
+        for n in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+
+    finished_pages = set()
+    checkpoint = start_page - 1
+    running = set(range(workers))
+    started = time.time()
+    try:
+        while running:
+            try:
+                kind, value = results.get(timeout=WORKER_POLL)
+            except queue.Empty:
+                # A worker killed outright (e.g. by the OOM killer) never reports "done"
+                for n in list(running):
+                    if not procs[n].is_alive():
+                        print(f"❌ [worker {n}] exited with code {procs[n].exitcode} without finishing")
+                        running.discard(n)
+                continue
+            if kind == "record":
+                hotel_data, card_hash = value
+                writer.write(hotel_data, card_hash=card_hash)
+            elif kind == "page":
+                finished_pages.add(value)
+                # Only move the checkpoint past pages with no gaps below them
+                advanced = False
+                while checkpoint + 1 in finished_pages:
+                    checkpoint += 1
+                    advanced = True
+                if advanced:
+                    writer.page_done(checkpoint)
+            elif kind == "done":
+                running.discard(value)
+        if last_page.value and checkpoint >= last_page.value:
+            writer.finish()
+    except BaseException:
+        # Workers blocked on the full queue could never exit: stop handing
+        # out pages and drain what they still send so they can quit Chrome
+        stop.set()
+        while any(proc.is_alive() for proc in procs):
+            try:
+                results.get(timeout=1)
+            except queue.Empty:
+                pass
+        raise
+    finally:
+        for proc in procs:
+            proc.join()
+        minutes = (time.time() - started) / 60
+        print(f"\n🎉 DONE — {workers} workers scraped {writer.written} hotels "
+              f"({writer.written / minutes if minutes else 0:.1f} hotels/min).")
+        writer.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Hilton pet-friendly hotels scraper")
+    parser.add_argument(
+        "command", nargs="?", default="crawl", choices=["crawl", "http", "compact", "parquet", "replay-capture", "reparse-html"],
+        help="crawl: scrape hotels with Chrome (default); http: replay recorded requests without a browser; "
+             "compact: export the JSONL sink to the JSON array file; "
+             "parquet: export the latest records to a typed, columnar Parquet file; "
+             "replay-capture: build records from responses saved with --capture-dir; "
+             "reparse-html: build records from popup HTML saved with --html-dir",
+    )
+    parser.add_argument(
+        "--json-mode", choices=["jsonl", "array"], default=JSON_OUTPUT_MODE,
+        help="JSON output mode used while crawling",
+    )
+    parser.add_argument(
+        "--storage", choices=["files", "sqlite", "both"], default=STORAGE,
+        help="files: CSV/JSON sinks; sqlite: upsert into the --store-file database; both (default)",
+    )
+    parser.add_argument("--store-file", default=STORE_FILE, help="SQLite hotel store (hotel_store.py)")
+    parser.add_argument(
+        "--extract-mode", choices=["js", "html", "selenium"], default=EXTRACT_MODE,
+        help="popup extraction: one execute_script call (js), outerHTML parsed offline with lxml (html) "
+             "or per-element locators (selenium)",
+    )
+    parser.add_argument(
+        "--html-dir", default=HTML_DIR,
+        help="directory for popup HTML snapshots (html mode) read by reparse-html",
+    )
+    parser.add_argument(
+        "--capture", action="store_true",
+        help="read hotels from Chrome's captured network responses instead of the DOM",
+    )
+    parser.add_argument(
+        "--capture-dir", default=CAPTURE_DIR,
+        help="directory where captured responses are saved (and read by replay-capture)",
+    )
+    parser.add_argument(
+        "--http-base-url", default=HTTP_BASE_URL,
+        help="send HTTP backend requests to this host instead of the recorded one",
+    )
+    parser.add_argument(
+        "--http-concurrency", type=int, default=HTTP_CONCURRENCY,
+        help="maximum parallel requests/connections for the HTTP backend",
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="only open popups for new hotels, changed cards or entries older than --stale-days",
+    )
+    parser.add_argument(
+        "--stale-days", type=float, default=STALE_DAYS,
+        help="re-extract hotels last scraped more than this many days ago in incremental mode",
+    )
+    parser.add_argument(
+        "--pacing", choices=["fast", "human"], default=PACING_PROFILE,
+        help="fast: wait only for page conditions; human: add random jitter between steps",
+    )
+    parser.add_argument("--launch-profile", choices=["default", "lean"], default=LAUNCH_PROFILE,
+                        help="Chrome launch profile; lean runs headless with a small viewport")
+    parser.add_argument("--no-block", action="store_true",
+                        help="download everything (disables resource blocking)")
+    parser.add_argument("--block-types", default=",".join(BLOCK_TYPES),
+                        help="comma-separated resource types to block, e.g. image,font,media,stylesheet")
+    parser.add_argument("--block-domain", action="append", default=[],
+                        help="extra domain to block (repeatable)")
+    parser.add_argument("--allow-domain", action="append", default=[],
+                        help="domain exempt from --block-domain rules (repeatable); images/fonts/media "
+                             "are still blocked by extension on every host")
+    parser.add_argument("--max-js-heap-mb", type=float, default=MAX_JS_HEAP_MB,
+                        help="recycle Chrome when the renderer JS heap exceeds this many MB")
+    parser.add_argument("--max-dom-nodes", type=int, default=MAX_DOM_NODES,
+                        help="recycle Chrome when the page holds more DOM nodes than this")
+    parser.add_argument("--max-rss-mb", type=float, default=MAX_RSS_MB,
+                        help="recycle Chrome when its process tree RSS exceeds this many MB (needs psutil)")
+    parser.add_argument("--max-error-rate", type=float, default=MAX_ERROR_RATE,
+                        help="recycle Chrome when more than this share of hotels fail")
+    parser.add_argument(
+        "--workers", type=int, default=WORKERS,
+        help="number of Chrome worker processes; more than 1 shards result pages across them",
+    )
+    parser.add_argument("--no-pipeline", action="store_true",
+                        help="parse and write each hotel on the browser thread")
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS,
+                        help="parser threads in the pipeline")
+    parser.add_argument("--queue-size", type=int, default=PIPELINE_QUEUE_SIZE,
+                        help="captured popups that may wait for parsing/writing before the browser blocks")
+    parser.add_argument("--write-batch", type=int, default=WRITE_BATCH_SIZE,
+                        help="most records written (and checkpointed) per sink write")
+    parser.add_argument("--command-budget", type=int, default=COMMAND_BUDGET,
+                        help="WebDriver commands allowed per hotel")
+    parser.add_argument("--budget-action", choices=["warn", "fail"], default=BUDGET_ACTION,
+                        help="what to do when a hotel exceeds --command-budget")
+    parser.add_argument("--profile", action="store_true",
+                        help="run under the sampling profiler: flame graph stacks plus a CPU / browser I/O / "
+                             "sleep summary")
+    parser.add_argument("--profile-out", default=PROFILE_OUT,
+                        help="path prefix for the .folded and .json profile outputs")
+    parser.add_argument("--metrics-jsonl", default=METRICS_JSONL,
+                        help="append stage timings/counters to this file as JSON lines (enables metrics)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="serve Prometheus metrics on localhost:PORT/metrics (enables metrics)")
+    parser.add_argument("--metrics-interval", type=float, default=METRICS_INTERVAL,
+                        help="seconds between JSON-lines metric snapshots")
+    return parser.parse_args()
+
+
+def run_command(command):
+    if command == "crawl" and WORKERS > 1:
+        pool_main(WORKERS)
+    elif command == "http":
+        http_main()
+    elif command == "compact":
+        compact_jsonl()
+    elif command == "parquet":
+        export_parquet()
+    elif command == "reparse-html":
+        if not HTML_DIR:
+            raise SystemExit("reparse-html needs --html-dir")
+        reparse_html(HTML_DIR)
+    elif command == "replay-capture":
+        if not CAPTURE_DIR:
+            raise SystemExit("replay-capture needs --capture-dir")
+        replay_capture(CAPTURE_DIR)
+    else:
+        main()
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    JSON_OUTPUT_MODE = args.json_mode
+    STORAGE = args.storage
+    STORE_FILE = args.store_file
+    EXTRACT_MODE = args.extract_mode
+    HTML_DIR = args.html_dir
+    CAPTURE_MODE = args.capture
+    CAPTURE_DIR = args.capture_dir
+    HTTP_BASE_URL = args.http_base_url
+    HTTP_CONCURRENCY = args.http_concurrency
+    WORKERS = args.workers
+    PIPELINE = not args.no_pipeline
+    PARSE_WORKERS = args.parse_workers
+    PIPELINE_QUEUE_SIZE = args.queue_size
+    WRITE_BATCH_SIZE = args.write_batch
+    INCREMENTAL = args.incremental
+    STALE_DAYS = args.stale_days
+    PACING_PROFILE = args.pacing
+    LAUNCH_PROFILE = args.launch_profile
+    BLOCK_RESOURCES = not args.no_block
+    BLOCK_TYPES = [t.strip() for t in args.block_types.split(",") if t.strip()]
+    BLOCK_DOMAINS = BLOCK_DOMAINS + args.block_domain
+    ALLOW_DOMAINS = ALLOW_DOMAINS + args.allow_domain
+    MAX_JS_HEAP_MB = args.max_js_heap_mb
+    MAX_DOM_NODES = args.max_dom_nodes
+    MAX_RSS_MB = args.max_rss_mb
+    MAX_ERROR_RATE = args.max_error_rate
+    COMMAND_BUDGET = args.command_budget
+    BUDGET_ACTION = args.budget_action
+    configure_metrics(args.metrics_jsonl, args.metrics_port, args.metrics_interval)
+    try:
+        with profiled(args.profile_out if args.profile else None):
+            run_command(args.command)
+    finally:
+        metrics.close()
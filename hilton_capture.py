@@ -0,0 +1,245 @@
+import base64
+import json
+import os
+import re
+
+# ================== CONFIG ==================
+
+# Responses worth keeping: Hilton's GraphQL endpoint and JSON data files
+DATA_URL_RE = re.compile(r"/graphql/|\.json(\?|$)")
+DATA_MIME_TYPES = ("application/json", "application/graphql-response+json")
+
+
+# ================== CHROME LOGGING ==================
+
+def enable_network_capture(opts):
+    """Turn on Chrome performance logging (Network.* events) for a session."""
+    opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return opts
+
+
+def parse_performance_log(entries):
+    events = []
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        events.append(message)
+    return events
+
+
+def is_data_response(response):
+    mime = (response.get("mimeType") or "").lower()
+    url = response.get("url") or ""
+    return mime.startswith(DATA_MIME_TYPES) or bool(DATA_URL_RE.search(url))
+
+
+class NetworkCapture:
+    """Collects data responses from a driver's performance log.
+
+    Request and response events can straddle two drains, so pending
+    requests are kept until their body is available. Every event is also
+    passed to `listeners`; with fetch_bodies=False only they see the log.
+    """
+
+    def __init__(self, driver, fetch_bodies=True, listeners=()):
+        self.driver = driver
+        self.fetch_bodies = fetch_bodies
+        self.listeners = list(listeners)
+        self.requests = {}
+        self.responses = {}
+
+    def drain(self):
+        payloads = []
+        for event in parse_performance_log(self.driver.get_log("performance")):
+            for listener in self.listeners:
+                listener(event)
+            if not self.fetch_bodies:
+                continue
+            method = event.get("method")
+            params = event.get("params", {})
+            request_id = params.get("requestId")
+
+            if method == "Network.requestWillBeSent":
+                self.requests[request_id] = params.get("request", {})
+            elif method == "Network.responseReceived":
+                response = params.get("response", {})
+                if is_data_response(response):
+                    self.responses[request_id] = response
+            elif method == "Network.loadingFinished" and request_id in self.responses:
+                response = self.responses.pop(request_id)
+                request = self.requests.pop(request_id, {})
+                body = self.fetch_body(request_id)
+                if body is None:
+                    continue
+                payloads.append({
+                    "url": response.get("url") or request.get("url", ""),
+                    "method": request.get("method", "GET"),
+                    "request_headers": request.get("headers", {}),
+                    "post_data": request.get("postData"),
+                    "status": response.get("status"),
+                    "mime_type": response.get("mimeType"),
+                    "body": body,
+                })
+            elif method == "Network.loadingFailed":
+                self.responses.pop(request_id, None)
+                self.requests.pop(request_id, None)
+        return payloads
+
+    def fetch_body(self, request_id):
+        try:
+            result = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            return None
+        text = result.get("body", "")
+        if result.get("base64Encoded"):
+            text = base64.b64decode(text).decode("utf-8", errors="replace")
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+
+# ================== FIXTURES ==================
+
+def save_payloads(payloads, directory, prefix=""):
+    """Save payloads as {prefix}{n:05d}.json; processes sharing `directory` need distinct prefixes."""
+    os.makedirs(directory, exist_ok=True)
+    start = len([f for f in os.listdir(directory) if f.endswith(".json") and f[:len(prefix)] == prefix
+                 and f[len(prefix):-5].isdigit()])
+    for n, payload in enumerate(payloads, start=start + 1):
+        path = os.path.join(directory, f"{prefix}{n:05d}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+
+
+def load_payloads(directory):
+    payloads = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            payloads.append(json.load(f))
+    return payloads
+
+
+# ================== PAYLOAD → RECORD ==================
+
+def find_hotels(node, found):
+    """Collect every object that looks like a Hilton hotel (has a ctyhocn)."""
+    if isinstance(node, dict):
+        if node.get("ctyhocn") and node.get("name"):
+            found.append(node)
+        for value in node.values():
+            find_hotels(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            find_hotels(value, found)
+    return found
+
+
+def merge_hotel(target, source):
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge_hotel(target[key], value)
+        elif value not in (None, "", [], {}):
+            target[key] = value
+    return target
+
+
+def first_value(obj, *paths):
+    for path in paths:
+        value = obj
+        for key in path.split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+            if value is None:
+                break
+        if value not in (None, "", [], {}):
+            return value
+    return None
+
+
+def leaf_text(node):
+    if isinstance(node, dict):
+        return " ".join(leaf_text(v) for v in node.values())
+    if isinstance(node, list):
+        return " ".join(leaf_text(v) for v in node)
+    return node if isinstance(node, str) else ""
+
+
+def format_address(address):
+    if isinstance(address, str):
+        return address
+    if not isinstance(address, dict):
+        return ""
+    if address.get("addressFmt"):
+        return address["addressFmt"]
+    parts = [address.get(k) for k in ("addressLine1", "city", "state", "country")]
+    return ", ".join(p for p in parts if p)
+
+
+def hotel_details(hotel):
+    """Map a captured hotel object to the details shape used by build_hotel_record()."""
+    overview = {}
+    for label, paths in (
+        ("Check-in", ("policy.checkinTimeFmt", "policy.checkinTime")),
+        ("Check-out", ("policy.checkoutTimeFmt", "policy.checkoutTime")),
+        ("Currency", ("localization.currencyName", "localization.currencyCode")),
+        ("Smoking", ("policy.smoking.smokingDesc", "policy.smokingDesc")),
+        ("Parking", ("policy.parking.parkingComments", "policy.parkingDesc")),
+        ("Pets", ("policy.pets.description", "policy.petsDesc", "pets.description")),
+    ):
+        value = first_value(hotel, *paths)
+        if value:
+            overview[label] = str(value)
+
+    rating = first_value(hotel, "tripAdvisorLocationSummary.rating", "rating")
+    amenities = [
+        a.get("name") if isinstance(a, dict) else a
+        for a in hotel.get("amenities") or []
+    ]
+    nearby = [
+        {"place": n.get("name", ""), "distance": n.get("distanceFmt") or n.get("distance", "")}
+        for n in first_value(hotel, "nearbyAttractions", "attractions", "pointsOfInterest") or []
+        if isinstance(n, dict) and n.get("name")
+    ]
+    airport = [
+        {
+            "airport": a.get("name", ""),
+            "distance": a.get("distanceFmt") or a.get("distance", ""),
+            "shuttle": "Airport shuttle" if a.get("shuttle") or a.get("shuttleService") else "",
+        }
+        for a in first_value(hotel, "airports", "policy.airports") or []
+        if isinstance(a, dict) and a.get("name")
+    ]
+
+    return {
+        "ctyhocn": hotel["ctyhocn"].upper(),
+        "name": hotel.get("name", ""),
+        "rating": f"Rating: {rating} out of 5.0" if rating else "",
+        "description": first_value(hotel, "facilityOverview.shortDesc", "shortDesc", "description") or "",
+        "address": format_address(hotel.get("address")),
+        "price": first_value(hotel, "leadRate.lowest.rateAmountFmt", "leadRate.rateAmountFmt") or "",
+        "phone": first_value(hotel, "contactInfo.phoneNumber", "phoneNumber") or "",
+        "overview": overview,
+        "amenities": [a for a in amenities if a],
+        "nearby": nearby,
+        "airport": airport,
+        "all_text": leaf_text(hotel),
+    }
+
+
+def has_details(details):
+    """True if captured details carry what the popup is opened for (pet policy or amenities)."""
+    return bool(details["overview"].get("Pets") or details["amenities"])
+
+
+def hotels_from_payloads(payloads):
+    """Build details for every hotel found in captured responses, merged by ctyhocn."""
+    merged = {}
+    for payload in payloads:
+        for hotel in find_hotels(payload.get("body"), []):
+            code = hotel["ctyhocn"].upper()
+            merge_hotel(merged.setdefault(code, {}), hotel)
+    return [hotel_details(hotel) for hotel in merged.values()]
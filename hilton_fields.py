@@ -0,0 +1,152 @@
+import csv
+import json
+import re
+from datetime import datetime
+
+from hilton_pets import MONEY_RE, load_records, parse_money, parse_pet_policy, pets_text
+
+# Typed view of a hotel record, shared by the columnar export
+# (hilton_parquet.py) and the SQLite store (hotel_store.py): JSON cells
+# decoded, address split, rating/price/distances/pet policy parsed.
+
+RATING_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:out of|/)")
+DISTANCE_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(km|kilometers?|kilometres?|mi|miles?)\b", re.I)
+MILE_TO_KM = 1.609344
+# "Self parking - Complimentary", "Valet parking - $55.00 / night"
+PARKING_RE = re.compile(r"\b(self|valet)[ -]parking\s*[-:–]\s*([^;,]+)", re.I)
+
+# Codes made up from the card position when no ctyhocn was found. The pager
+# reuses them across hotels, so they do not identify one.
+LEGACY_CODE_RE = re.compile(r"^HILTON-\d+-\d+$")
+
+# "$"/"¥" are left as symbols by hilton_pets; the hotel's country settles them
+LOCAL_CURRENCIES = {
+    ("$", "US"): "USD", ("$", "CA"): "CAD", ("$", "AU"): "AUD", ("$", "NZ"): "NZD", ("$", "MX"): "MXN",
+    ("$", "SG"): "SGD", ("$", "HK"): "HKD", ("$", "TW"): "TWD", ("¥", "CN"): "CNY", ("¥", "JP"): "JPY",
+}
+
+# ================== FIELD PARSING ==================
+
+def loads(cell, default):
+    try:
+        value = json.loads(cell) if cell else default
+    except ValueError:
+        return default
+    return value if isinstance(value, type(default)) else default
+
+
+def split_address(address):
+    """(city, region, country) from Hilton's "City, [Region,] CC" card address."""
+    parts = [p.strip() for p in (address or "").split(",") if p.strip()]
+    if len(parts) < 2:
+        return (parts[0] if parts else None), None, None
+    return parts[0], (", ".join(parts[1:-1]) or None), parts[-1]
+
+
+def parse_rating(text):
+    match = RATING_RE.search(text or "")
+    return float(match.group(1)) if match else None
+
+
+def parse_price(text):
+    match = MONEY_RE.search(text or "")
+    return parse_money(match) if match else (None, None)
+
+
+def distance_km(text):
+    match = DISTANCE_RE.search(text or "")
+    if not match:
+        return None
+    value = float(match.group(1).replace(",", "."))
+    return round(value * MILE_TO_KM, 2) if match.group(2).lower().startswith("mi") else value
+
+
+def resolve_currency(currency, country):
+    return LOCAL_CURRENCIES.get((currency, country), currency)
+
+
+def parse_parking(texts):
+    """[{"kind": "self"|"valet", "charge": ..., "complimentary": bool}] from parking policy texts."""
+    options = []
+    for text in texts:
+        for kind, charge in PARKING_RE.findall(str(text)):
+            charge = charge.strip()
+            options.append({"kind": kind.lower(), "charge": charge,
+                            "complimentary": charge.lower() in ("complimentary", "free")})
+    return options
+
+
+def parse_timestamp(text):
+    try:
+        return datetime.fromisoformat((text or "").replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def typed_record(record):
+    """The record with typed values (None when a field is missing or unparseable)."""
+    city, region, country = split_address(record.get("address"))
+    amount, currency = parse_price(record.get("card_price"))
+    # Re-derived rather than read back, so CSV/legacy inputs type the same way
+    pets = parse_pet_policy(pets_text(record))
+    parking = loads(record.get("parking_json"), {})
+    return {
+        "hotel_code": record.get("hotel_code"),
+        "hotel_name": record.get("hotel_name"),
+        "address": record.get("address"),
+        "city": city,
+        "region": region,
+        "country": country,
+        "phone": record.get("phone") or None,
+        "rating": parse_rating(record.get("rating")),
+        "description": record.get("description") or None,
+        "card_price": record.get("card_price") or None,
+        "price_amount": amount,
+        "price_currency": resolve_currency(currency, country),
+        "overview": list(loads(record.get("overview_table_json"), {}).items()),
+        "pets": list(loads(record.get("pets_json"), {}).items()),
+        "parking": list(parking.items()),
+        "parking_options": parse_parking(parking.values()),
+        "amenities": loads(record.get("amenities_json"), []),
+        "nearby": [
+            {"place": n.get("place"), "distance": n.get("distance"), "distance_km": distance_km(n.get("distance"))}
+            for n in loads(record.get("nearby_json"), [])
+        ],
+        "airports": [
+            {"airport": a.get("airport"), "distance": a.get("distance"),
+             "distance_km": distance_km(a.get("distance")), "shuttle": a.get("shuttle")}
+            for a in loads(record.get("airport_json"), [])
+        ],
+        "is_pet_friendly": str(record.get("is_pet_friendly")).lower() == "true",
+        "pet_fee_amount": pets["pet_fee_amount"],
+        "pet_fee_currency": resolve_currency(pets["pet_fee_currency"], country),
+        "pet_fee_refundable": pets["pet_fee_refundable"],
+        "pet_fee_basis": pets["pet_fee_basis"],
+        "pet_max_weight_kg": pets["pet_max_weight_kg"],
+        "pet_max_count": pets["pet_max_count"],
+        "pet_species": pets["pet_species"].split(",") if pets["pet_species"] else [],
+        "last_updated": parse_timestamp(record.get("last_updated")),
+    }
+
+
+def hotel_key(record):
+    """Identity of a record's hotel: its ctyhocn, or name + address for legacy page/card codes."""
+    code = record.get("hotel_code") or ""
+    if LEGACY_CODE_RE.match(code) and record.get("hotel_name"):
+        return f"{record['hotel_name']}|{record.get('address') or ''}"
+    return code
+
+
+def latest_records(records):
+    """Last version of each hotel (see hotel_key), in first-seen order."""
+    latest = {}
+    for record in records:
+        latest[hotel_key(record)] = record
+    return list(latest.values())
+
+
+def read_records(path):
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    return load_records(path)
@@ -0,0 +1,92 @@
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def process_tree_rss(pid):
+    """Resident memory of a process and all its children, in bytes (None without psutil)."""
+    if psutil is None or not pid:
+        return None
+    try:
+        root = psutil.Process(pid)
+        procs = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return None
+    total = 0
+    for proc in procs:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            continue
+    return total
+
+
+class BrowserHealth:
+    """Decides when a Chrome session is degrading enough to be recycled.
+
+    Signals: renderer JS heap and DOM node count (CDP Performance.getMetrics),
+    RSS of the Chrome process tree, and the share of hotels that failed since
+    the browser was started. A threshold of None disables that signal.
+    """
+
+    def __init__(self, max_js_heap_mb=None, max_dom_nodes=None, max_rss_mb=None, max_error_rate=None,
+                 min_attempts=5):
+        self.max_js_heap_mb = max_js_heap_mb
+        self.max_dom_nodes = max_dom_nodes
+        self.max_rss_mb = max_rss_mb
+        self.max_error_rate = max_error_rate
+        self.min_attempts = min_attempts
+        self.last_hotels = 0
+        self.last_errors = 0
+
+    def reset(self, counter):
+        """Start a new error window, e.g. after a restart."""
+        self.last_hotels = counter.hotels
+        self.last_errors = counter.errors
+
+    def sample(self, driver, counter):
+        metrics = {}
+        try:
+            if not getattr(driver, "_performance_enabled", False):
+                driver.execute_cdp_cmd("Performance.enable", {})
+                driver._performance_enabled = True
+            values = {m["name"]: m["value"] for m in driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]}
+            metrics["js_heap_mb"] = values.get("JSHeapUsedSize", 0) / 2**20
+            metrics["dom_nodes"] = int(values.get("Nodes", 0))
+        except Exception as e:
+            print(f"⚠ Performance.getMetrics failed: {e}")
+
+        rss = process_tree_rss(getattr(driver, "browser_pid", None))
+        if rss is not None:
+            metrics["rss_mb"] = rss / 2**20
+
+        ok = counter.hotels - self.last_hotels
+        failed = counter.errors - self.last_errors
+        metrics["attempts"] = ok + failed
+        metrics["error_rate"] = failed / (ok + failed) if ok + failed else 0.0
+        return metrics
+
+    def check(self, driver, counter):
+        """Return (recycle?, reasons, metrics) and log the decision."""
+        metrics = self.sample(driver, counter)
+        reasons = []
+        for key, limit in (
+            ("js_heap_mb", self.max_js_heap_mb),
+            ("dom_nodes", self.max_dom_nodes),
+            ("rss_mb", self.max_rss_mb),
+        ):
+            if limit is not None and metrics.get(key, 0) > limit:
+                reasons.append(f"{key} {metrics[key]:.0f} > {limit}")
+        if (self.max_error_rate is not None and metrics["attempts"] >= self.min_attempts
+                and metrics["error_rate"] > self.max_error_rate):
+            reasons.append(f"error_rate {metrics['error_rate']:.0%} > {self.max_error_rate:.0%}")
+
+        summary = ", ".join(
+            f"{k} {metrics[k]:.0f}" for k in ("js_heap_mb", "dom_nodes", "rss_mb") if k in metrics
+        )
+        if reasons:
+            print(f"🩺 Recycling browser ({summary}): {'; '.join(reasons)}")
+        else:
+            print(f"🩺 Browser healthy ({summary}, error_rate {metrics['error_rate']:.0%})")
+        return bool(reasons), reasons, metrics
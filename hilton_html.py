@@ -0,0 +1,141 @@
+import json
+import os
+import sys
+import time
+
+from lxml import html as lxml_html
+
+from hilton_index import CTYHOCN_RE
+
+# Offline counterpart of the Selenium parse_* helpers in hilton.py. The
+# XPaths are the same; they run over the popup's outerHTML with lxml.
+
+
+def text_of(el):
+    # Selenium's .text collapses whitespace the way the browser renders it
+    return " ".join(el.text_content().split()) if el is not None else ""
+
+
+def first_text(root, xpath):
+    found = root.xpath(xpath)
+    return text_of(found[0]) if found else ""
+
+
+def parse_overview_table(root):
+    data = {}
+    for row in root.xpath(".//table//tr"):
+        th = row.xpath(".//th")
+        td = row.xpath(".//td")
+        if th and td:
+            data[text_of(th[0])] = text_of(td[0])
+    return data
+
+
+def parse_amenities(root):
+    amenities = []
+    for li in root.xpath(".//ul[contains(@class,'peer flex')]/li"):
+        label = first_text(li, ".//span[@data-testid='hotelAmenityLabel']")
+        if label:
+            amenities.append(label)
+    return amenities
+
+
+def parse_nearby(root):
+    data = []
+    for item in root.xpath(".//*[@id='tab-panel-nearBy']//li"):
+        place = first_text(item, ".//div[1]/span")
+        distance = first_text(item, ".//div[2]")
+        if place:
+            data.append({"place": place, "distance": distance})
+    return data
+
+
+def parse_airport_info(root):
+    data = []
+    for item in root.xpath(".//*[@id='tab-panel-airport']//li"):
+        name = first_text(item, ".//div[1]/div/span[last()]")
+        distance = first_text(item, ".//div[1]/div[2]")
+        shuttle = first_text(item, ".//p")
+        if name:
+            data.append({"airport": name, "distance": distance, "shuttle": shuttle})
+    return data
+
+
+def find_ctyhocn(root):
+    for href in root.xpath(".//a/@href"):
+        m = CTYHOCN_RE.search(href)
+        if m:
+            return m.group(1).upper()
+    return None
+
+
+def parse_popup_html(popup_html, address="", price=""):
+    """Details dict (as consumed by build_hotel_record) from a popup's outerHTML.
+
+    address and price live outside the popup, so they are captured
+    alongside the HTML and passed through.
+    """
+    root = lxml_html.fromstring(popup_html)
+    lines = (t.strip() for t in root.itertext())
+    return {
+        "ctyhocn": find_ctyhocn(root),
+        "name": first_text(root, ".//h1 | .//h2"),
+        "rating": first_text(root, ".//p[contains(text(),'Rating')]"),
+        "description": first_text(root, ".//div/p[@class='inline text-start md:block']"),
+        "address": address,
+        "price": price,
+        "overview": parse_overview_table(root),
+        "amenities": parse_amenities(root),
+        "nearby": parse_nearby(root),
+        "airport": parse_airport_info(root),
+        "all_text": "\n".join(t for t in lines if t),
+    }
+
+
+def parse_snapshot(snapshot):
+    """Details from a captured {html, address, price, tabs} snapshot.
+
+    tabs holds the nearby/airport lists read in the browser; they are used
+    when the HTML does not contain those panels (React had not rendered them).
+    """
+    details = parse_popup_html(snapshot["html"], snapshot.get("address", ""), snapshot.get("price", ""))
+    tabs = snapshot.get("tabs") or {}
+    for key in ("nearby", "airport"):
+        if not details[key] and tabs.get(key):
+            details[key] = tabs[key]
+    return details
+
+
+# ================== STORED SNAPSHOTS ==================
+
+def save_snapshot(directory, name, snapshot):
+    """Store a captured popup snapshot as <name>.json."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{name}.json"), "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+
+
+def iter_snapshots(directory):
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".json"):
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                yield filename[:-5], json.load(f)
+
+
+def reparse_directory(directory):
+    """Yield (snapshot name, details) for every stored popup snapshot."""
+    for name, snapshot in iter_snapshots(directory):
+        yield name, parse_snapshot(snapshot)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        raise SystemExit("usage: python hilton_html.py SNAPSHOT_DIR")
+    started = time.perf_counter()
+    count = 0
+    for name, details in reparse_directory(sys.argv[1]):
+        print(json.dumps({"snapshot": name, **details}, ensure_ascii=False))
+        count += 1
+    elapsed = time.perf_counter() - started
+    print(f"Parsed {count} popups in {elapsed:.3f}s ({elapsed / count * 1e6 if count else 0:.0f} µs each)",
+          file=sys.stderr)
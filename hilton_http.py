@@ -0,0 +1,206 @@
+import json
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+
+from hilton_capture import find_hotels, hotels_from_payloads, load_payloads
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+# ================== CONFIG ==================
+
+HTTP_CONCURRENCY = 8
+HTTP_TIMEOUT = 30
+REFUSED_STATUSES = {401, 403, 429}
+DROP_HEADERS = {"host", "content-length", "cookie", "connection", "accept-encoding"}
+
+
+class HttpRefused(Exception):
+    pass
+
+
+# ================== REQUEST TEMPLATES ==================
+
+def split_templates(payloads):
+    """Sort recorded requests into listing requests and per-hotel detail requests.
+
+    A response with several hotels is a listing; one with a single hotel is a
+    detail request that can be replayed for other hotels by swapping its ctyhocn.
+    """
+    listing, detail = [], None
+    for payload in payloads:
+        codes = {h["ctyhocn"].upper() for h in find_hotels(payload.get("body"), [])}
+        if len(codes) > 1:
+            listing.append(payload)
+        elif len(codes) == 1 and detail is None and payload.get("post_data"):
+            detail = (payload, codes.pop())
+    return listing, detail
+
+
+def rebase_url(url, base_url):
+    if not base_url:
+        return url
+    base = urlsplit(base_url)
+    parts = urlsplit(url)
+    return urlunsplit((base.scheme, base.netloc, parts.path, parts.query, parts.fragment))
+
+
+def swap_code(text, old, new):
+    if not text:
+        return text
+    return re.sub(re.escape(old), lambda m: new.lower() if m.group(0).islower() else new, text, flags=re.I)
+
+
+# ================== CLIENT ==================
+
+class HiltonHttpClient:
+    """Replays recorded Hilton data requests over one pooled keep-alive client.
+
+    bootstrap, if given, is called once when the site refuses a request and
+    must return (cookies, headers) taken from a real browser session. Requests
+    refused with the old session (sent before the refresh) are retried once.
+    """
+
+    def __init__(self, base_url=None, concurrency=HTTP_CONCURRENCY, bootstrap=None):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.bootstrap = bootstrap
+        self.bootstrapped = False
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.client = httpx.Client(
+            http2=HTTP2,
+            timeout=HTTP_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+
+    def close(self):
+        self.client.close()
+
+    def refresh_session(self, generation):
+        """True if the session changed since `generation` (a retry is worthwhile)."""
+        with self.lock:
+            if self.generation != generation:
+                return True
+            if self.bootstrapped or not self.bootstrap:
+                return False
+            print("🍪 HTTP request refused — bootstrapping cookies with Chrome")
+            cookies, headers = self.bootstrap()
+            self.client.cookies.update(cookies)
+            self.client.headers.update(headers)
+            self.bootstrapped = True
+            self.generation += 1
+            return True
+
+    def send(self, template, old_code=None, new_code=None):
+        url = rebase_url(template["url"], self.base_url)
+        body = template.get("post_data")
+        if old_code and new_code:
+            url = swap_code(url, old_code, new_code)
+            body = swap_code(body, old_code, new_code)
+        headers = {
+            k: v for k, v in (template.get("request_headers") or {}).items()
+            if not k.startswith(":") and k.lower() not in DROP_HEADERS
+        }
+
+        for attempt in range(2):
+            generation = self.generation
+            response = self.client.request(template.get("method", "GET"), url, content=body, headers=headers)
+            if response.status_code in REFUSED_STATUSES and attempt == 0 and self.refresh_session(generation):
+                continue
+            break
+        if response.status_code in REFUSED_STATUSES:
+            raise HttpRefused(f"{response.status_code} from {url}")
+        response.raise_for_status()
+        return {"url": url, "status": response.status_code, "body": response.json()}
+
+    def fetch_listing(self, templates):
+        return [self.send(t) for t in templates]
+
+    def fetch_details(self, detail, codes):
+        template, recorded_code = detail
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [pool.submit(self.send, template, recorded_code, code) for code in codes]
+            payloads = []
+            for code, future in zip(codes, futures):
+                try:
+                    payloads.append(future.result())
+                except HttpRefused:
+                    raise
+                except Exception as e:
+                    print(f"⚠ Detail request failed for {code}: {e}")
+            return payloads
+
+
+def crawl(template_dir, base_url=None, concurrency=HTTP_CONCURRENCY, bootstrap=None):
+    """Fetch every hotel over HTTP and return details dicts (see hotel_details())."""
+    listing_templates, detail = split_templates(load_payloads(template_dir))
+    if not listing_templates:
+        raise ValueError(f"No listing request found in {template_dir}; record one with --capture-dir")
+
+    client = HiltonHttpClient(base_url, concurrency, bootstrap)
+    try:
+        payloads = client.fetch_listing(listing_templates)
+        codes = sorted({h["ctyhocn"].upper() for p in payloads for h in find_hotels(p["body"], [])})
+        print(f"🌐 Listing returned {len(codes)} hotels (HTTP/2: {HTTP2})")
+        if detail:
+            payloads += client.fetch_details(detail, codes)
+        return hotels_from_payloads(payloads)
+    finally:
+        client.close()
+
+
+# ================== STUB SERVER ==================
+
+def serve_fixtures(directory, port=8765):
+    """Local server answering recorded requests with their recorded bodies.
+
+    Requests are matched on method, path+query and body, so the HTTP backend
+    can be pointed at it with base_url="http://127.0.0.1:<port>".
+    """
+    routes = {}
+    for payload in load_payloads(directory):
+        parts = urlsplit(payload["url"])
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        key = (payload.get("method", "GET"), path, payload.get("post_data") or "")
+        routes[key] = json.dumps(payload["body"]).encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def respond(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode("utf-8") if length else ""
+            data = routes.get((self.command, self.path, body))
+            self.send_response(200 if data is not None else 404)
+            data = data if data is not None else b"{}"
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = respond
+        do_POST = respond
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"🧪 Serving {len(routes)} recorded responses on http://127.0.0.1:{port}")
+    return server
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit("usage: python hilton_http.py FIXTURE_DIR [PORT]")
+    serve_fixtures(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 8765).serve_forever()
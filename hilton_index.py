@@ -0,0 +1,111 @@
+import hashlib
+import json
+import re
+import sqlite3
+from datetime import datetime, timedelta
+
+INDEX_FILE = "hilton_index.sqlite"
+
+# Hilton property code (ctyhocn) as it appears in hotel URLs: /en/hotels/mnlnwhh-hilton-manila/
+CTYHOCN_RE = re.compile(r"/hotels/([a-z0-9]{5,8})-", re.I)
+
+# Fields that change on every scrape without the hotel itself changing
+VOLATILE_FIELDS = ("hotel_code", "last_updated")
+
+
+def card_fingerprint(name, price, rating):
+    """Cheap hash of what the results list shows for a hotel, or None if nothing is visible."""
+    if not (name or price or rating):
+        return None
+    encoded = "\x1f".join((name or "", price or "", rating or "")).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def needs_refresh(entry, card_hash, stale_days=None, now=None):
+    """Whether a hotel's popup must be opened again in an incremental crawl.
+
+    entry is the index entry (content hash, last seen, card hash) or None.
+    """
+    if entry is None:
+        return True
+    _, last_seen, previous_card = entry
+    if card_hash is None or card_hash != previous_card:
+        return True
+    if stale_days is not None:
+        age = (now or datetime.utcnow()) - datetime.fromisoformat(last_seen)
+        if age > timedelta(days=stale_days):
+            return True
+    return False
+
+
+def content_hash(record):
+    content = {k: v for k, v in record.items() if k not in VOLATILE_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+class HotelIndex:
+    """Persistent map of hotel code → (content hash, last seen, card hash).
+
+    The table is loaded into a dict on open so lookups during a crawl are
+    O(1); every update is written through to SQLite.
+    """
+
+    def __init__(self, path=INDEX_FILE):
+        # Opened on the main thread, written by the pipeline's writer thread
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS hotels ("
+            " code TEXT PRIMARY KEY,"
+            " content_hash TEXT NOT NULL,"
+            " last_seen TEXT NOT NULL,"
+            " card_hash TEXT)"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(hotels)")}
+        if "card_hash" not in columns:
+            self.conn.execute("ALTER TABLE hotels ADD COLUMN card_hash TEXT")
+        self.entries = {
+            code: (digest, last_seen, card_hash)
+            for code, digest, last_seen, card_hash in self.conn.execute(
+                "SELECT code, content_hash, last_seen, card_hash FROM hotels"
+            )
+        }
+
+    def __contains__(self, code):
+        return code in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, code):
+        return self.entries.get(code)
+
+    def update(self, record, card_hash=None):
+        """Store the record's hash; returns True if it is new or its content changed."""
+        return self.update_many([(record, card_hash)])[0]
+
+    def update_many(self, items):
+        """update() for several (record, card hash) pairs in one transaction."""
+        changed = []
+        rows = []
+        for record, card_hash in items:
+            code = record["hotel_code"]
+            digest = content_hash(record)
+            last_seen = record.get("last_updated") or datetime.utcnow().isoformat()
+            previous = self.entries.get(code)
+            if card_hash is None and previous:
+                card_hash = previous[2]
+            self.entries[code] = (digest, last_seen, card_hash)
+            rows.append((code, digest, last_seen, card_hash))
+            changed.append(previous is None or previous[0] != digest)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO hotels (code, content_hash, last_seen, card_hash) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(code) DO UPDATE SET content_hash = excluded.content_hash, "
+                "last_seen = excluded.last_seen, card_hash = excluded.card_hash",
+                rows,
+            )
+        return changed
+
+    def close(self):
+        self.conn.close()
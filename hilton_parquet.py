@@ -0,0 +1,120 @@
+import argparse
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from hilton_fields import latest_records, read_records, typed_record
+
+# Columnar export of the hotel records. The *_json string cells become real
+# map/list/struct columns, the address is split into dictionary-encoded
+# city/region/country, and rating, price and the pet-policy fields are typed,
+# so analytics can scan and filter columns without a json.loads per cell.
+
+OUTPUT_FILE_PARQUET = "hilton_pet_friendly_hotels.parquet"
+COMPRESSION = "zstd"
+
+TEXT = pa.string()
+LABEL = pa.dictionary(pa.int32(), pa.string())
+TEXT_MAP = pa.map_(pa.string(), pa.string())
+
+SCHEMA = pa.schema([
+    ("hotel_code", TEXT),
+    ("hotel_name", TEXT),
+    ("address", TEXT),
+    ("city", LABEL),
+    ("region", LABEL),
+    ("country", LABEL),
+    ("phone", TEXT),
+    ("rating", pa.float32()),
+    ("description", TEXT),
+    ("card_price", TEXT),
+    ("price_amount", pa.float64()),
+    ("price_currency", LABEL),
+    ("overview", TEXT_MAP),
+    ("pets", TEXT_MAP),
+    ("parking", TEXT_MAP),
+    ("amenities", pa.list_(TEXT)),
+    ("nearby", pa.list_(pa.struct([("place", TEXT), ("distance", TEXT), ("distance_km", pa.float64())]))),
+    ("airports", pa.list_(pa.struct([("airport", TEXT), ("distance", TEXT), ("distance_km", pa.float64()),
+                                     ("shuttle", TEXT)]))),
+    ("is_pet_friendly", pa.bool_()),
+    ("pet_fee_amount", pa.float64()),
+    ("pet_fee_currency", LABEL),
+    ("pet_fee_refundable", pa.bool_()),
+    ("pet_fee_basis", LABEL),
+    ("pet_max_weight_kg", pa.float64()),
+    ("pet_max_count", pa.int16()),
+    ("pet_species", pa.list_(TEXT)),
+    ("last_updated", pa.timestamp("us")),
+])
+
+
+# ================== ARROW ==================
+
+def to_table(records):
+    rows = [typed_record(r) for r in records]
+    arrays = []
+    for field in SCHEMA:
+        values = [r[field.name] for r in rows]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, field.type.value_type).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+
+def write_parquet(records, path=OUTPUT_FILE_PARQUET, compression=COMPRESSION):
+    """Write the latest version of every hotel to `path`; returns the row count."""
+    table = to_table(latest_records(records))
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp, compression=compression)
+    os.replace(tmp, path)
+    return table.num_rows
+
+
+def read_hotels(path=OUTPUT_FILE_PARQUET, columns=None, amenity=None, min_weight_kg=None, country=None):
+    """Load the export, filtering on columns instead of parsing cells.
+
+    Scalar filters are pushed down to the Parquet reader (row groups whose
+    statistics cannot match are skipped); amenity membership is evaluated on
+    the flattened list column.
+    """
+    filters = []
+    if min_weight_kg is not None:
+        filters.append(("pet_max_weight_kg", ">=", min_weight_kg))
+    if country:
+        filters.append(("country", "=", country))
+    if columns and amenity and "amenities" not in columns:
+        columns = list(columns) + ["amenities"]
+    table = pq.read_table(path, columns=columns, filters=filters or None)
+    if amenity:
+        amenities = table["amenities"]
+        matches = pc.equal(pc.list_flatten(amenities), amenity)
+        rows = pc.unique(pc.filter(pc.list_parent_indices(amenities), matches))
+        table = table.take(rows)
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar (Parquet) export of the Hilton hotel records")
+    parser.add_argument("input", nargs="?", default="hilton_pet_friendly_hotels.json",
+                        help="JSON array, JSONL or CSV of hotel records")
+    parser.add_argument("--output", default=OUTPUT_FILE_PARQUET)
+    parser.add_argument("--compression", default=COMPRESSION)
+    parser.add_argument("--amenity", help="after exporting, list hotels with this amenity")
+    parser.add_argument("--min-weight", type=float, help="after exporting, list hotels allowing pets this heavy (kg)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    count = write_parquet(read_records(args.input), args.output, args.compression)
+    print(f"🧱 Wrote {count} hotels → {args.output} in {time.perf_counter() - started:.2f}s")
+    if args.amenity or args.min_weight is not None:
+        started = time.perf_counter()
+        table = read_hotels(args.output, columns=["hotel_code", "hotel_name", "city", "pet_max_weight_kg"],
+                            amenity=args.amenity, min_weight_kg=args.min_weight)
+        print(f"🔎 {table.num_rows} matching hotels in {(time.perf_counter() - started) * 1000:.1f} ms")
+        for hotel in table.select(["hotel_code", "hotel_name", "city", "pet_max_weight_kg"]).to_pylist()[:20]:
+            print(f"   {hotel['hotel_code']}  {hotel['hotel_name']} ({hotel['city']}, {hotel['pet_max_weight_kg']} kg)")
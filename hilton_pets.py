@@ -0,0 +1,199 @@
+import argparse
+import json
+import re
+import time
+from functools import lru_cache
+
+# Turns the free-text pet policy ("Pets allowed, $75.00 non-refundable fee,
+# 75 lbs maximum, Max 2 pets (cats/dogs) per room") into typed fields.
+# Hilton's text starts with a structured prefix (fee, refundability, weight
+# limit); the rest is hotel-written prose, searched as a fallback.
+
+# ================== PATTERNS ==================
+
+# Symbols and codes a fee can be written with → ISO 4217 code. "$" and "¥"
+# are kept as symbols: they are shared by several currencies.
+CURRENCIES = {
+    "US$": "USD", "AU$": "AUD", "NZ$": "NZD", "R$": "BRL", "S$": "SGD", "A$": "AUD", "C$": "CAD",
+    "HK$": "HKD", "NT$": "TWD",
+    "€": "EUR", "£": "GBP", "₱": "PHP", "P": "PHP", "₽": "RUB", "₹": "INR", "₩": "KRW", "฿": "THB",
+    "₫": "VND", "₺": "TRY", "RM": "MYR", "CHF": "CHF", "zł": "PLN", "Kč": "CZK", "￥": "¥",
+    "TBH": "THB", "RMB": "CNY",
+    "rubles": "RUB", "roubles": "RUB", "baht": "THB", "yuan": "CNY", "yen": "JPY",
+    "euro": "EUR", "euros": "EUR", "pesos": "PHP", "dollars": "$",
+}
+ISO_CODES = ("USD", "EUR", "GBP", "JPY", "CNY", "THB", "PHP", "RUB", "INR", "KRW", "MYR", "SGD", "AUD", "CAD",
+             "HKD", "TWD", "AED", "SAR", "QAR", "TRY", "MXN", "BRL", "CHF", "NZD", "ZAR", "VND", "IDR", "PLN",
+             "CZK", "EGP", "UZS")
+
+_symbols = sorted([k for k in CURRENCIES if not k.isalpha() or k in ("RM", "CHF", "TBH", "RMB")] + ["$", "¥", "¤"],
+                  key=len, reverse=True)
+SYMBOL = "|".join(re.escape(s) for s in _symbols) + r"|P(?=\s?\d)|" + "|".join(ISO_CODES)
+WORD_CURRENCY = "|".join(k for k in CURRENCIES if k.isalpha() and k.islower())
+AMOUNT = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+
+# "$75.00", "¥ 200.00", "3,000.00₽", "1000 rubles", "¤500,000.00 UZS" (¤: the code follows)
+MONEY_RE = re.compile(
+    rf"(?:(?P<pre>{SYMBOL})\s?(?P<amount>{AMOUNT})(?:\s?(?P<code>{'|'.join(ISO_CODES)})\b)?"
+    rf"|(?P<amount2>{AMOUNT})\s?(?P<post>{SYMBOL}|(?:{WORD_CURRENCY})\b))"
+)
+# "$75.00 non-refundable fee", "¥1,000.00 refundable deposit"
+FEE_RE = re.compile(rf"(?P<money>{MONEY_RE.pattern})\s*(?P<refund>non-refundable|refundable)\s+(?:fee|deposit)",
+                    re.I)
+FREE_RE = re.compile(r"\b(?:at no (?:additional )?charge|free of charge|no (?:pet )?fee|no charge)\b", re.I)
+NIGHT_RE = re.compile(r"\bper (?:room )?(?:per )?(?:night|day)\b|\bnightly\b|/\s?night\b", re.I)
+STAY_RE = re.compile(r"\bper (?:room )?(?:per )?stay\b|\bone[- ]time\b", re.I)
+
+WEIGHT = r"(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>lbs?|pounds?|kgs?|kilograms?|kilos?)\b"
+STRUCTURED_WEIGHT_RE = re.compile(WEIGHT + r"\s+maximum", re.I)
+WEIGHT_RE = re.compile(WEIGHT, re.I)
+LB_TO_KG = 0.45359237
+
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "a single": 1, "single": 1}
+COUNT = r"(?P<count>\d+|one|two|three|four|five|a single|single)"
+ANIMAL = r"(?:pets?|dogs?|cats?|animals?)"
+MAX_PETS_RES = (
+    re.compile(rf"\b(?:max(?:imum)?(?: of)?|up to|limit(?: of)?|no more than)\s*{COUNT}\s*(?:small |medium )?{ANIMAL}",
+               re.I),
+    re.compile(rf"\b{COUNT}\s*{ANIMAL}\s*(?:max(?:imum)?|per room|limit)", re.I),
+    re.compile(rf"\bonly\s+{COUNT}\s+{ANIMAL}", re.I),
+    re.compile(rf"\b{COUNT}\s+{ANIMAL}\s+(?:is|are)\s+(?:allowed|accepted|permitted)", re.I),
+)
+SPECIES_RE = re.compile(r"\b(dog|cat|bird|rabbit|ferret|hamster|fish)(?:s|es)?\b", re.I)
+
+FIELDS = ("pet_fee_amount", "pet_fee_currency", "pet_fee_refundable", "pet_fee_basis", "pet_max_weight_kg",
+          "pet_max_count", "pet_species")
+EMPTY = dict.fromkeys(FIELDS)
+
+
+# ================== EXTRACTION ==================
+
+def parse_money(match):
+    amount = float((match.group("amount") or match.group("amount2")).replace(",", ""))
+    symbol = match.group("code") or match.group("pre") or match.group("post") or ""
+    currency = CURRENCIES.get(symbol, CURRENCIES.get(symbol.lower(), symbol))
+    return amount, currency
+
+
+def fee_basis(text, start):
+    """'night' or 'stay' from the wording right after a fee, if it says so."""
+    window = text[start:start + 60]
+    night = NIGHT_RE.search(window)
+    stay = STAY_RE.search(window)
+    if night and (not stay or night.start() < stay.start()):
+        return "night"
+    if stay:
+        return "stay"
+    return None
+
+
+def parse_fee(text):
+    fee = FEE_RE.search(text)
+    if fee:
+        amount, currency = parse_money(MONEY_RE.match(fee.group("money")))
+        # Hilton's structured fee/deposit is charged once per stay
+        return amount, currency, fee.group("refund").lower() == "refundable", fee_basis(text, fee.end()) or "stay"
+    money = MONEY_RE.search(text)
+    if money:
+        amount, currency = parse_money(money)
+        return amount, currency, None, fee_basis(text, money.end())
+    if FREE_RE.search(text):
+        return 0.0, None, None, None
+    return None, None, None, None
+
+
+def to_kg(value, unit):
+    value = float(value)
+    if unit.lower().startswith(("lb", "pound")):
+        value *= LB_TO_KG
+    return round(value, 1)
+
+
+def parse_weight(text):
+    structured = STRUCTURED_WEIGHT_RE.search(text)
+    if structured:
+        return to_kg(structured.group("value"), structured.group("unit"))
+    weights = [to_kg(m.group("value"), m.group("unit")) for m in WEIGHT_RE.finditer(text)]
+    return max(weights) if weights else None
+
+
+def parse_max_pets(text):
+    for pattern in MAX_PETS_RES:
+        match = pattern.search(text)
+        if match:
+            count = match.group("count").lower()
+            return int(count) if count.isdigit() else NUMBER_WORDS[count]
+    return None
+
+
+@lru_cache(maxsize=4096)
+def parse_pet_policy(text):
+    """Typed pet-policy fields for one policy text (missing facts are None)."""
+    if not text:
+        return EMPTY
+    amount, currency, refundable, basis = parse_fee(text)
+    species = sorted({m.group(1).lower() for m in SPECIES_RE.finditer(text)})
+    return {
+        "pet_fee_amount": amount,
+        "pet_fee_currency": currency,
+        "pet_fee_refundable": refundable,
+        "pet_fee_basis": basis,
+        "pet_max_weight_kg": parse_weight(text),
+        "pet_max_count": parse_max_pets(text),
+        "pet_species": ",".join(species) or None,
+    }
+
+
+def pets_text(record):
+    """The policy text of a hotel record (values of its pets_json)."""
+    try:
+        pets = json.loads(record.get("pets_json") or "{}")
+    except ValueError:
+        return ""
+    return " ".join(str(v) for v in pets.values())
+
+
+def parse_pet_policies(texts):
+    """parse_pet_policy() over a batch; each distinct text is parsed once."""
+    parsed = {text: parse_pet_policy(text) for text in set(texts)}
+    return [parsed[text] for text in texts]
+
+
+def enrich_records(records):
+    """Add the typed pet fields to every record in place; returns the records."""
+    for record, fields in zip(records, parse_pet_policies([pets_text(r) for r in records])):
+        record.update(fields)
+    return records
+
+
+# ================== CLI ==================
+
+def load_records(path):
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Typed pet-policy fields for stored Hilton records")
+    parser.add_argument("input", nargs="?", default="hilton_pet_friendly_hotels.json",
+                        help="JSON array or JSONL of hotel records")
+    parser.add_argument("--output", help="write the enriched records here (.jsonl or .json)")
+    args = parser.parse_args()
+
+    records = load_records(args.input)
+    started = time.perf_counter()
+    enrich_records(records)
+    elapsed = time.perf_counter() - started
+    found = {field: sum(r[field] is not None for r in records) for field in FIELDS}
+    print(f"🐾 Parsed pet policies of {len(records)} hotels in {elapsed * 1000:.1f} ms")
+    for field, count in found.items():
+        print(f"   {field}: {count}/{len(records)}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            if args.output.endswith(".jsonl"):
+                f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+            else:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+        print(f"📝 Wrote {args.output}")
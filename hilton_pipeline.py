@@ -0,0 +1,173 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StageStats:
+    """Items handled and time spent busy by one pipeline stage."""
+
+    def __init__(self, name, workers=1):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, seconds, items=1):
+        with self.lock:
+            self.items += items
+            self.busy += seconds
+
+    def utilization(self, elapsed):
+        return self.busy / (elapsed * self.workers) if elapsed else 0.0
+
+
+class Pipeline:
+    """Browser → parser pool → batched writer, connected by a bounded queue.
+
+    The browser thread submit()s raw items and goes back to the page while
+    parser threads build records and a single writer thread hands them to
+    write_batch() in batches. Parse results are written in submission order
+    and mark() values (e.g. "page done") reach on_mark() after every item
+    submitted before them, so a checkpoint never gets ahead of the data.
+    A parse or write failure stops the writer and is re-raised by the next
+    submit()/mark()/close(). When the queue is full, submit() blocks: a slow downstream stage shows
+    up as browser time spent waiting.
+    """
+
+    def __init__(self, parse, write_batch, on_mark, parsers=2, queue_size=64, batch_size=25, batch_wait=0.5):
+        self.parse = parse
+        self.write_batch = write_batch
+        self.on_mark = on_mark
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=parsers, thread_name_prefix="parser")
+        self.stats = {
+            "browser": StageStats("browser"),
+            "parse": StageStats("parse", parsers),
+            "write": StageStats("write"),
+        }
+        self.parsing = 0
+        self.parsing_lock = threading.Lock()
+        self.blocked = 0.0
+        self.error = None
+        self.started = time.perf_counter()
+        self.last_submit = self.started
+        self.writer = threading.Thread(target=self._write_loop, name="writer", daemon=True)
+        self.writer.start()
+
+    # ---------- browser thread ----------
+
+    def submit(self, item, meta=()):
+        """Queue a raw item; meta is passed on to write_batch() after the record."""
+        now = time.perf_counter()
+        self.stats["browser"].add(now - self.last_submit)
+        with self.parsing_lock:
+            self.parsing += 1
+        self._put(("item", self.executor.submit(self._parse, item), meta))
+        self.last_submit = time.perf_counter()
+
+    def mark(self, value):
+        self._put(("mark", value, None))
+
+    def close(self):
+        """Drain every stage and stop the threads; re-raises a writer failure."""
+        if self.writer.is_alive():
+            self._put(None)
+            self.writer.join()
+        self.executor.shutdown()
+        if self.error:
+            raise self.error
+
+    def _put(self, entry):
+        started = time.perf_counter()
+        while True:
+            if self.error:
+                raise self.error
+            try:
+                self.queue.put(entry, timeout=1)
+                break
+            except queue.Full:
+                continue
+        self.blocked += time.perf_counter() - started
+
+    # ---------- parser threads ----------
+
+    def _parse(self, item):
+        started = time.perf_counter()
+        try:
+            return self.parse(item)
+        finally:
+            self.stats["parse"].add(time.perf_counter() - started)
+            with self.parsing_lock:
+                self.parsing -= 1
+
+    # ---------- writer thread ----------
+
+    def _write_loop(self):
+        batch = []
+        try:
+            while True:
+                try:
+                    entry = self.queue.get(timeout=self.batch_wait if batch else None)
+                except queue.Empty:
+                    batch = self._flush(batch)
+                    continue
+                if entry is None:
+                    self._flush(batch)
+                    return
+                kind, value, meta = entry
+                if kind == "mark":
+                    batch = self._flush(batch)
+                    self.on_mark(value)
+                    continue
+                try:
+                    record = value.result()
+                except Exception:
+                    # Stop like the inline path: later items must not move the
+                    # checkpoint past a hotel that was never written
+                    self._flush(batch)
+                    raise
+                batch.append((record, *meta))
+                if len(batch) >= self.batch_size:
+                    batch = self._flush(batch)
+        except Exception as e:
+            print(f"❌ Writer stopped: {e}")
+            self.error = e
+
+    def _flush(self, batch):
+        if batch:
+            started = time.perf_counter()
+            self.write_batch(batch)
+            self.stats["write"].add(time.perf_counter() - started, len(batch))
+        return []
+
+    # ---------- reporting ----------
+
+    def snapshot(self):
+        """Per-stage counters, rates, utilization and queue depths."""
+        elapsed = time.perf_counter() - self.started
+        depths = {"browser": 0, "parse": self.parsing, "write": self.queue.qsize()}
+        stages = {
+            name: {
+                "items": stats.items,
+                "per_min": stats.items / elapsed * 60 if elapsed else 0.0,
+                "busy": stats.utilization(elapsed),
+                "queue": depths[name],
+            }
+            for name, stats in self.stats.items()
+        }
+        return {"elapsed_s": elapsed, "browser_blocked_s": self.blocked, "stages": stages}
+
+    def report(self):
+        snapshot = self.snapshot()
+        stages = snapshot["stages"]
+        parts = [
+            f"{name} {s['items']} ({s['per_min']:.1f}/min, busy {s['busy']:.0%}, queue {s['queue']})"
+            for name, s in stages.items()
+        ]
+        bottleneck = max(stages, key=lambda name: stages[name]["busy"])
+        return (f"🚰 Pipeline: {'; '.join(parts)}; browser waited {snapshot['browser_blocked_s']:.1f}s "
+                f"on a full queue; bottleneck: {bottleneck}")
@@ -0,0 +1,115 @@
+import random
+import time
+
+from crawl_metrics import metrics
+
+# ================== CONFIG ==================
+
+CONDITION_TIMEOUT = 15
+
+# Deliberate human-like pauses per step, as (min, max) seconds. "fast" waits
+# only for the page conditions below.
+PACING_PROFILES = {
+    "fast": {},
+    "human": {
+        "click": (0.3, 1.0),
+        "close": (0.4, 1.2),
+        "page": (1.5, 3.5),
+    },
+}
+
+# ================== CONDITIONS ==================
+
+# Each condition is the body of `(args) => boolean`, evaluated in the page.
+CARDS_READY = """
+return document.evaluate(
+    "//button[.//span[normalize-space()='View hotel details']]",
+    document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+).singleNodeValue !== null;
+"""
+
+CARD_SIGNATURE = """
+const btn = document.evaluate(
+    "//button[.//span[normalize-space()='View hotel details']]",
+    document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+).singleNodeValue;
+return btn ? (btn.closest("li") || btn.parentElement).innerText : "";
+"""
+
+# args[0]: CARD_SIGNATURE before the page change
+CARDS_CHANGED = """
+const sig = (() => {""" + CARD_SIGNATURE + """})();
+return sig !== "" && sig !== args[0];
+"""
+
+# args[0]: popup CSS selector
+MODAL_CLOSED = """
+return document.querySelector(args[0]) === null;
+"""
+
+# args[0]: element that should receive the click
+CLICKABLE = """
+const el = args[0];
+const r = el.getBoundingClientRect();
+if (!r.width || !r.height) return false;
+const hit = document.elementFromPoint(r.left + r.width / 2, r.top + r.height / 2);
+return hit !== null && (hit === el || el.contains(hit));
+"""
+
+WAIT_TEMPLATE = """
+const args = arguments[0];
+const timeoutMs = arguments[1];
+const done = arguments[arguments.length - 1];
+const check = (args) => {
+    try { __CONDITION__ } catch (e) { return false; }
+};
+
+if (check(args)) {
+    done(true);
+} else {
+    let timer = null;
+    const observer = new MutationObserver(() => {
+        if (check(args)) finish(true);
+    });
+    const finish = (ok) => {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(ok);
+    };
+    observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    timer = setTimeout(() => finish(check(args)), timeoutMs);
+}
+"""
+
+
+def ensure_script_timeout(driver, seconds):
+    """Raise the driver's async script timeout to at least `seconds` (never lowers it)."""
+    if getattr(driver, "_script_timeout", 0) < seconds:
+        driver.set_script_timeout(seconds)
+        driver._script_timeout = seconds
+
+
+def wait_for(driver, condition, *args, timeout=CONDITION_TIMEOUT):
+    """Wait in the browser until `condition` holds; one round-trip, returns False on timeout."""
+    ensure_script_timeout(driver, timeout + 5)
+    script = WAIT_TEMPLATE.replace("__CONDITION__", condition)
+    return bool(driver.execute_async_script(script, list(args), int(timeout * 1000)))
+
+
+def card_signature(driver):
+    return driver.execute_script(CARD_SIGNATURE)
+
+
+# ================== PACING ==================
+
+class Pacer:
+    """Optional jitter on top of the completion conditions."""
+
+    def __init__(self, profile="fast"):
+        self.steps = PACING_PROFILES[profile]
+
+    def pause(self, step):
+        bounds = self.steps.get(step)
+        if bounds:
+            with metrics.span("pacing"):
+                time.sleep(random.uniform(*bounds))
@@ -0,0 +1,407 @@
+import argparse
+import json
+import re
+import sqlite3
+import time
+
+STORE_FILE = "hotels.sqlite"
+# Keys per "IN (...)" lookup; stays under SQLite's default variable limit
+KEY_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hotels (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    hotel_key TEXT NOT NULL,
+    hotel_name TEXT,
+    address TEXT,
+    city TEXT,
+    region TEXT,
+    country TEXT,
+    phone TEXT,
+    url TEXT,
+    rating REAL,
+    description TEXT,
+    price_amount REAL,
+    price_currency TEXT,
+    is_pet_friendly INTEGER,
+    pet_fee_amount REAL,
+    pet_fee_currency TEXT,
+    pet_fee_refundable INTEGER,
+    pet_fee_basis TEXT,
+    pet_max_weight_kg REAL,
+    pet_max_count INTEGER,
+    pet_species TEXT,
+    last_updated TEXT,
+    record_json TEXT NOT NULL,
+    UNIQUE (source, hotel_key)
+);
+CREATE TABLE IF NOT EXISTS amenities (
+    hotel_id INTEGER NOT NULL REFERENCES hotels(id) ON DELETE CASCADE,
+    amenity TEXT NOT NULL,
+    PRIMARY KEY (hotel_id, amenity)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS nearby (
+    hotel_id INTEGER NOT NULL REFERENCES hotels(id) ON DELETE CASCADE,
+    place TEXT,
+    distance TEXT,
+    distance_km REAL
+);
+CREATE TABLE IF NOT EXISTS airports (
+    hotel_id INTEGER NOT NULL REFERENCES hotels(id) ON DELETE CASCADE,
+    airport TEXT,
+    distance TEXT,
+    distance_km REAL,
+    shuttle TEXT
+);
+CREATE TABLE IF NOT EXISTS parking (
+    hotel_id INTEGER NOT NULL REFERENCES hotels(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    charge TEXT,
+    complimentary INTEGER
+);
+CREATE INDEX IF NOT EXISTS hotels_location ON hotels (city, country);
+CREATE INDEX IF NOT EXISTS hotels_country ON hotels (country, city);
+CREATE INDEX IF NOT EXISTS hotels_pets ON hotels (is_pet_friendly, pet_max_weight_kg);
+CREATE INDEX IF NOT EXISTS hotels_pet_fee ON hotels (pet_fee_amount);
+CREATE INDEX IF NOT EXISTS amenities_by_name ON amenities (amenity, hotel_id);
+CREATE INDEX IF NOT EXISTS nearby_hotel ON nearby (hotel_id);
+CREATE INDEX IF NOT EXISTS airports_hotel ON airports (hotel_id);
+CREATE INDEX IF NOT EXISTS parking_by_kind ON parking (kind, complimentary, hotel_id);
+"""
+
+# Full-text index, one row per hotel (rowid = hotels.id). Prefix indexes make
+# "park*"-style queries an index lookup instead of a term scan.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS hotels_fts USING fts5(
+    hotel_name, description, amenities, policies,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+"""
+# Rebuilt from the stored rows, so upserts and reindex() index the same text;
+# policies are the values of Hilton's overview table (check-in, pets, parking...)
+SEARCH_ROWS_SQL = """
+INSERT INTO hotels_fts (rowid, hotel_name, description, amenities, policies)
+SELECT h.id, h.hotel_name, h.description,
+       (SELECT group_concat(amenity, ' · ') FROM amenities WHERE hotel_id = h.id),
+       (SELECT group_concat(value, ' · ') FROM json_each(
+            CASE WHEN json_valid(json_extract(h.record_json, '$.overview_table_json'))
+                 THEN json_extract(h.record_json, '$.overview_table_json') END))
+FROM hotels h
+"""
+# bm25() column weights: hotel_name, description, amenities, policies
+SEARCH_WEIGHTS = (5.0, 1.0, 3.0, 2.0)
+SEARCH_TOKEN_RE = re.compile(r'"([^"]*)"(\*?)|(\S+)')
+
+# hotels columns filled from a typed row (everything but id/source/hotel_key/record_json)
+COLUMNS = (
+    "hotel_name", "address", "city", "region", "country", "phone", "url", "rating", "description",
+    "price_amount", "price_currency", "is_pet_friendly", "pet_fee_amount", "pet_fee_currency",
+    "pet_fee_refundable", "pet_fee_basis", "pet_max_weight_kg", "pet_max_count", "pet_species", "last_updated",
+)
+# child table → (typed row key, columns)
+CHILD_TABLES = {
+    "amenities": ("amenities", ("amenity",)),
+    "nearby": ("nearby", ("place", "distance", "distance_km")),
+    "airports": ("airports", ("airport", "distance", "distance_km", "shuttle")),
+    "parking": ("parking_options", ("kind", "charge", "complimentary")),
+}
+
+UPSERT_SQL = (
+    f"INSERT INTO hotels (source, hotel_key, {', '.join(COLUMNS)}, record_json) "
+    f"VALUES ({', '.join('?' * (len(COLUMNS) + 3))}) "
+    f"ON CONFLICT (source, hotel_key) DO UPDATE SET "
+    + ", ".join(f"{c} = excluded.{c}" for c in COLUMNS + ("record_json",))
+)
+
+
+def fts_query(text):
+    """FTS5 MATCH expression for user input: words are ANDed, "quoted text"
+    is a phrase, a trailing * makes a word or phrase a prefix. Everything is
+    quoted, so punctuation ("EV-charging", "24/7") cannot break the syntax.
+    """
+    terms = []
+    for phrase, phrase_star, word in SEARCH_TOKEN_RE.findall(text):
+        if word:
+            star = "*" if word.endswith("*") and len(word) > 1 else ""
+            phrase, phrase_star = word.rstrip("*").replace('"', ""), star
+        elif phrase.endswith("*"):
+            phrase, phrase_star = phrase.rstrip("*"), "*"
+        if phrase.strip():
+            terms.append(f'"{phrase}"{phrase_star}')
+    return " ".join(terms)
+
+
+def sql_value(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (list, tuple)):
+        return ",".join(map(str, value)) or None
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+class HotelStore:
+    """Hotels from every scraper in one SQLite database (WAL mode).
+
+    Rows are upserted by (source, hotel_key) so re-scraping a hotel replaces
+    it in place; amenities, nearby places, airports and parking options live
+    in child tables that are rewritten with their hotel. upsert_many() runs a
+    whole batch in one transaction. Location, pet attributes, amenities and
+    parking kinds are indexed, so find() never scans the raw records. A
+    full-text index (FTS5) over names, descriptions, amenities and policies
+    is updated in the same transaction and queried with search().
+    """
+
+    def __init__(self, path=STORE_FILE):
+        # Opened on the main thread, written by the pipeline's writer thread
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: durable across application crashes, fsync per checkpoint
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self.searchable = self.create_search_index()
+
+    def create_search_index(self):
+        existed = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'hotels_fts'").fetchone()
+        try:
+            self.conn.executescript(SEARCH_SCHEMA)
+        except sqlite3.OperationalError as e:
+            print(f"⚠ Full-text search disabled (SQLite without FTS5?): {e}")
+            return False
+        if not existed and len(self):
+            # Store created before the index existed
+            self.searchable = True
+            self.reindex()
+        return True
+
+    def upsert_many(self, source, rows):
+        """Insert or replace (hotel_key, typed row, raw record) items in one transaction.
+
+        Returns the hotel ids in input order.
+        """
+        if not rows:
+            return []
+        # A key repeated within the batch: the last version wins
+        latest = list({key: (key, typed, raw) for key, typed, raw in rows}.values())
+        with self.conn:
+            self.conn.executemany(UPSERT_SQL, [
+                (source, key, *(sql_value(typed.get(c)) for c in COLUMNS), json.dumps(raw, ensure_ascii=False))
+                for key, typed, raw in latest
+            ])
+            ids = self.ids(source, [key for key, _, _ in latest])
+            hotel_ids = [ids[key] for key, _, _ in latest]
+            for table, (field, columns) in CHILD_TABLES.items():
+                self.conn.executemany(f"DELETE FROM {table} WHERE hotel_id = ?", [(i,) for i in hotel_ids])
+                children = []
+                for hotel_id, (_, typed, _) in zip(hotel_ids, latest):
+                    for child in typed.get(field) or []:
+                        if isinstance(child, str):
+                            child = {columns[0]: child}
+                        # str/float/bool only: sqlite3 binds them as they are
+                        children.append((hotel_id, *map(child.get, columns)))
+                if table == "amenities":
+                    children = list(dict.fromkeys(children))
+                if children:
+                    self.conn.executemany(
+                        f"INSERT INTO {table} (hotel_id, {', '.join(columns)}) "
+                        f"VALUES ({', '.join('?' * (len(columns) + 1))})",
+                        children,
+                    )
+            if self.searchable:
+                self.index_text(hotel_ids)
+        return [ids[key] for key, _, _ in rows]
+
+    def index_text(self, hotel_ids):
+        """Replace the full-text rows of these hotels (inside the caller's transaction)."""
+        self.conn.executemany("DELETE FROM hotels_fts WHERE rowid = ?", [(i,) for i in hotel_ids])
+        for start in range(0, len(hotel_ids), KEY_CHUNK):
+            chunk = hotel_ids[start:start + KEY_CHUNK]
+            self.conn.execute(SEARCH_ROWS_SQL + f" WHERE h.id IN ({', '.join('?' * len(chunk))})", chunk)
+
+    def reindex(self):
+        """Rebuild the full-text index from the stored hotels and merge its segments."""
+        with self.conn:
+            self.conn.execute("DELETE FROM hotels_fts")
+            self.conn.execute(SEARCH_ROWS_SQL)
+            self.conn.execute("INSERT INTO hotels_fts (hotels_fts) VALUES ('optimize')")
+
+    def ids(self, source, keys):
+        found = {}
+        keys = list(dict.fromkeys(keys))
+        for start in range(0, len(keys), KEY_CHUNK):
+            chunk = keys[start:start + KEY_CHUNK]
+            found.update(self.conn.execute(
+                f"SELECT hotel_key, id FROM hotels WHERE source = ? AND hotel_key IN ({', '.join('?' * len(chunk))})",
+                [source, *chunk],
+            ))
+        return found
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM hotels").fetchone()[0]
+
+    # ---------- queries ----------
+
+    def query(self, source=None, city=None, country=None, pet_friendly=None, min_weight_kg=None,
+              amenity=None, parking=None, free_parking=False, limit=None):
+        """(SQL, params) for find(); every filter maps to an indexed column."""
+        where, params = [], []
+        for column, value in (("source", source), ("city", city), ("country", country)):
+            if value is not None:
+                where.append(f"h.{column} = ?")
+                params.append(value)
+        if pet_friendly is not None:
+            where.append("h.is_pet_friendly = ?")
+            params.append(int(pet_friendly))
+        if min_weight_kg is not None:
+            where.append("h.pet_max_weight_kg >= ?")
+            params.append(min_weight_kg)
+        if amenity:
+            where.append("h.id IN (SELECT hotel_id FROM amenities WHERE amenity = ?)")
+            params.append(amenity)
+        if parking or free_parking:
+            clause = "SELECT hotel_id FROM parking WHERE kind = ?" if parking else \
+                "SELECT hotel_id FROM parking WHERE kind IN ('self', 'valet')"
+            if parking:
+                params.append(parking)
+            if free_parking:
+                clause += " AND complimentary = 1"
+            where.append(f"h.id IN ({clause})")
+        sql = ("SELECT h.source, h.hotel_key, h.hotel_name, h.city, h.country, h.rating, h.pet_max_weight_kg "
+               "FROM hotels h")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY h.rating IS NULL, h.rating DESC, h.hotel_name"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return sql, params
+
+    def find(self, **filters):
+        """Hotels matching the filters, best rated first, as dicts."""
+        sql, params = self.query(**filters)
+        cursor = self.conn.execute(sql, params)
+        names = [d[0] for d in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def explain(self, **filters):
+        sql, params = self.query(**filters)
+        return [row[-1] for row in self.conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+    def search(self, text, source=None, limit=20, raw=False):
+        """Hotels matching a full-text query, best (lowest bm25) first.
+
+        text is plain input (see fts_query) unless raw=True, in which case it
+        is passed to MATCH as FTS5 query syntax (NEAR, OR, column filters...).
+        """
+        if not self.searchable:
+            return []
+        query = text if raw else fts_query(text)
+        if not query:
+            return []
+        sql = (
+            "SELECT h.source, h.hotel_key, h.hotel_name, h.city, h.country, "
+            f"bm25(hotels_fts, {', '.join(map(str, SEARCH_WEIGHTS))}) AS score, "
+            "snippet(hotels_fts, -1, '[', ']', '…', 12) AS snippet "
+            "FROM hotels_fts JOIN hotels h ON h.id = hotels_fts.rowid "
+            "WHERE hotels_fts MATCH ?"
+        )
+        params = [query]
+        if source:
+            sql += " AND h.source = ?"
+            params.append(source)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(int(limit))
+        cursor = self.conn.execute(sql, params)
+        names = [d[0] for d in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def record(self, source, hotel_key):
+        row = self.conn.execute(
+            "SELECT record_json FROM hotels WHERE source = ? AND hotel_key = ?", (source, hotel_key)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def analyze(self):
+        """Refresh the planner statistics (after a bulk load)."""
+        self.conn.execute("ANALYZE")
+
+    def close(self):
+        # Lets SQLite re-analyze tables whose statistics went stale
+        self.conn.execute("PRAGMA optimize")
+        self.conn.close()
+
+
+# ================== CLI ==================
+
+if __name__ == "__main__":
+    from hilton_fields import hotel_key, read_records, typed_record
+
+    parser = argparse.ArgumentParser(description="Query or load the SQLite hotel store")
+    parser.add_argument("--store", default=STORE_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("load", help="upsert Hilton records from a JSON, JSONL or CSV output file")
+    load.add_argument("input", nargs="?", default="hilton_pet_friendly_hotels.json")
+    load.add_argument("--batch", type=int, default=500)
+    find = sub.add_parser("find", help="indexed lookup, e.g. --city Kunming --pet-friendly --parking self")
+    find.add_argument("--source")
+    find.add_argument("--city")
+    find.add_argument("--country")
+    find.add_argument("--pet-friendly", action="store_true")
+    find.add_argument("--min-weight", type=float)
+    find.add_argument("--amenity")
+    find.add_argument("--parking", choices=["self", "valet"])
+    find.add_argument("--free-parking", action="store_true")
+    find.add_argument("--limit", type=int, default=50)
+    find.add_argument("--explain", action="store_true", help="print SQLite's query plan")
+    search = sub.add_parser("search", help='ranked full-text search, e.g. "dog park" cat* "EV charg*"')
+    search.add_argument("text")
+    search.add_argument("--source")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--raw", action="store_true", help="TEXT is FTS5 query syntax")
+    sub.add_parser("reindex", help="rebuild the full-text index from the stored hotels")
+    args = parser.parse_args()
+
+    store = HotelStore(args.store)
+    if args.command == "load":
+        records = read_records(args.input)
+        started = time.perf_counter()
+        for start in range(0, len(records), args.batch):
+            batch = records[start:start + args.batch]
+            store.upsert_many("hilton", [(hotel_key(r), typed_record(r), r) for r in batch])
+        store.analyze()
+        print(f"🗄 Upserted {len(records)} records in {time.perf_counter() - started:.2f}s "
+              f"({len(store)} hotels in {args.store})")
+    elif args.command == "reindex":
+        started = time.perf_counter()
+        store.reindex()
+        print(f"🔤 Re-indexed {len(store)} hotels in {time.perf_counter() - started:.2f}s")
+    elif args.command == "search":
+        started = time.perf_counter()
+        try:
+            hits = store.search(args.text, source=args.source, limit=args.limit, raw=args.raw)
+        except sqlite3.OperationalError as e:
+            raise SystemExit(f"❌ Bad query: {e}")
+        print(f"🔎 {len(hits)} hotels in {(time.perf_counter() - started) * 1000:.1f} ms")
+        for hit in hits:
+            print(f"   {hit['score']:7.2f}  {hit['hotel_key']}  {hit['hotel_name']} ({hit['city']}, {hit['country']})")
+            print(f"            {hit['snippet']}")
+    else:
+        filters = {
+            "source": args.source, "city": args.city, "country": args.country,
+            "pet_friendly": True if args.pet_friendly else None, "min_weight_kg": args.min_weight,
+            "amenity": args.amenity, "parking": args.parking, "free_parking": args.free_parking,
+            "limit": args.limit,
+        }
+        if args.explain:
+            for step in store.explain(**filters):
+                print(f"   plan: {step}")
+        started = time.perf_counter()
+        hotels = store.find(**filters)
+        print(f"🔎 {len(hotels)} hotels in {(time.perf_counter() - started) * 1000:.1f} ms")
+        for hotel in hotels:
+            print(f"   {hotel['hotel_key']}  {hotel['hotel_name']} ({hotel['city']}, {hotel['country']}) "
+                  f"rating {hotel['rating']}, pets ≤ {hotel['pet_max_weight_kg']} kg")
+    store.close()
@@ -1,18 +1,38 @@
 from playwright.sync_api import sync_playwright, TimeoutError as PWTimeoutError
+import argparse
 import csv
 import os
 import random
+import re
 import time
 from datetime import datetime
 
+from crawl_metrics import configure as configure_metrics, metrics
+from crawl_profile import profiled
+from hotel_store import STORE_FILE, HotelStore
+from resource_filter import ResourcePolicy, install_playwright_filter, playwright_page_report
+
 SEARCH_URL = "https://www.marriott.com/search"
 OUTPUT_CITY_LINKS = "marriott_city_links.csv"
 OUTPUT_HOTELS = "marriott_hotels.csv"
 PROFILE_DIR = "playwright-profile-marriott"
 HEADLESS = True
+# Abort image/font/media and tracker requests (see resource_filter.py)
+BLOCK_RESOURCES = True
+# Stage timings/counters (crawl_metrics.py); off unless an export is set
+METRICS_JSONL = ""
+METRICS_PORT = 0
+METRICS_INTERVAL = 30
+# --profile: sample the run's stacks and write PROFILE_OUT.folded/.json
+PROFILE_OUT = "marriott_profile"
+# "files" writes OUTPUT_HOTELS, "sqlite" upserts each results page into the
+# shared hotel store (hotel_store.py), "both" does both
+STORAGE = "both"
+SCORE_RE = re.compile(r"\d+(?:\.\d+)?")
 
 def human_wait(a=0.8, b=1.8):
-    time.sleep(random.uniform(a, b))
+    with metrics.span("pacing"):
+        time.sleep(random.uniform(a, b))
 
 def timestamp():
     return datetime.utcnow().strftime("%Y%m%d-%H%M%S")
@@ -76,13 +96,21 @@ def debug_dump(page, prefix="debug"):
 def safe_inner_text(locator, timeout=1200):
     try:
         return locator.inner_text(timeout=timeout).strip()
+    except PWTimeoutError:
+        metrics.inc("timeouts", stage="inner_text")
+        return ""
     except Exception:
+        metrics.inc("swallowed_exceptions", stage="inner_text")
         return ""
 
 def safe_get_attribute(locator, name, timeout=1200):
     try:
         return locator.get_attribute(name, timeout=timeout)
+    except PWTimeoutError:
+        metrics.inc("timeouts", stage="get_attribute")
+        return None
     except Exception:
+        metrics.inc("swallowed_exceptions", stage="get_attribute")
         return None
 
 def normalize_url(href: str):
@@ -111,6 +139,9 @@ def launch_browser(p):
             "--start-maximized",
         ],
     )
+    filter_stats = None
+    if BLOCK_RESOURCES:
+        filter_stats = install_playwright_filter(context, ResourcePolicy())
     page = context.new_page()
     page.set_default_timeout(60000)
     try:
@@ -120,12 +151,18 @@ def launch_browser(p):
         })
     except Exception:
         pass
-    return context, page
+    return context, page, filter_stats
+
+def report_resources(page, filter_stats, label):
+    if filter_stats is not None:
+        print(playwright_page_report(page, filter_stats, label))
 
-def collect_city_links(page):
-    page.goto(SEARCH_URL, wait_until="domcontentloaded")
+def collect_city_links(page, filter_stats=None):
+    with metrics.span("page_load"):
+        page.goto(SEARCH_URL, wait_until="domcontentloaded")
     human_wait()
-    accept_consent_if_present(page)
+    with metrics.span("consent"):
+        accept_consent_if_present(page)
     human_wait()
 
     # Light human-like actions to allow cookies, reduce bot suspicion
@@ -137,25 +174,29 @@ def collect_city_links(page):
         pass
 
     # Wait for city links container
-    page.wait_for_selector("div.panel-body ul.panel-links li.links-list a.links")
-
-    links = page.locator("div.panel-body ul.panel-links li.links-list a.links")
-    count = links.count()
-    city_data = []
-    for i in range(count):
-        link = links.nth(i)
-        name = safe_inner_text(link)
-        href = safe_get_attribute(link, "href") or ""
-        full_url = normalize_url(href)
-        if name and full_url:
-            city_data.append({"name": name, "url": full_url})
-
-    with open(OUTPUT_CITY_LINKS, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["name", "url"])
-        writer.writeheader()
-        writer.writerows(city_data)
+    with metrics.span("wait_links"):
+        page.wait_for_selector("div.panel-body ul.panel-links li.links-list a.links")
+
+    with metrics.span("extract_links"):
+        links = page.locator("div.panel-body ul.panel-links li.links-list a.links")
+        count = links.count()
+        city_data = []
+        for i in range(count):
+            link = links.nth(i)
+            name = safe_inner_text(link)
+            href = safe_get_attribute(link, "href") or ""
+            full_url = normalize_url(href)
+            if name and full_url:
+                city_data.append({"name": name, "url": full_url})
+
+    with metrics.span("write"):
+        with open(OUTPUT_CITY_LINKS, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["name", "url"])
+            writer.writeheader()
+            writer.writerows(city_data)
 
     print(f"Saved {len(city_data)} city links to {OUTPUT_CITY_LINKS}")
+    report_resources(page, filter_stats, "City links")
     return city_data
 
 def wait_for_hotel_cards(page):
@@ -169,11 +210,14 @@ def wait_for_hotel_cards(page):
     ]
     for sel in candidates:
         try:
-            page.wait_for_selector(sel, timeout=15000, state="attached")
+            with metrics.span("wait_cards"):
+                page.wait_for_selector(sel, timeout=15000, state="attached")
             return sel
         except PWTimeoutError:
+            metrics.inc("timeouts", stage="wait_cards")
             continue
         except Exception:
+            metrics.inc("swallowed_exceptions", stage="wait_cards")
             continue
     return None
 
@@ -248,6 +292,20 @@ def extract_hotels_from_page(page, cards_selector):
         })
     return hotels
 
+def store_row(hotel, city_name=None):
+    """(key, typed row, raw record) for HotelStore.upsert_many()."""
+    score = SCORE_RE.search(hotel.get("review_score") or "")
+    typed = {
+        "hotel_name": hotel.get("hotel_name") or None,
+        "url": hotel.get("view_details") or None,
+        "city": (city_name or "").split(",")[0].strip() or None,
+        "rating": float(score.group()) if score else None,
+        "description": hotel.get("description") or None,
+        "last_updated": datetime.utcnow().isoformat(),
+    }
+    return hotel.get("view_details") or hotel.get("hotel_name"), typed, hotel
+
+
 def paginate_next(page):
     # Try multiple next selectors
     candidates = [
@@ -262,25 +320,33 @@ def paginate_next(page):
         loc = page.locator(sel).first
         try:
             if loc.count() and loc.is_enabled() and loc.is_visible():
-                loc.click()
-                page.wait_for_load_state("networkidle", timeout=60000)
+                with metrics.span("paginate"):
+                    loc.click()
+                    page.wait_for_load_state("networkidle", timeout=60000)
                 human_wait()
                 return True
+        except PWTimeoutError:
+            metrics.inc("timeouts", stage="paginate")
+            continue
         except Exception:
+            metrics.inc("swallowed_exceptions", stage="paginate")
             continue
     return False
 
-def scrape_first_city(page, city_url):
+def scrape_first_city(page, city_url, filter_stats=None, store=None, city_name=None):
     hotels_all = []
 
     # Navigate and prepare
-    page.goto(city_url, wait_until="domcontentloaded")
+    with metrics.span("page_load"):
+        page.goto(city_url, wait_until="domcontentloaded")
     human_wait()
-    accept_consent_if_present(page)
+    with metrics.span("consent"):
+        accept_consent_if_present(page)
     try:
-        page.wait_for_load_state("networkidle", timeout=60000)
+        with metrics.span("network_idle"):
+            page.wait_for_load_state("networkidle", timeout=60000)
     except Exception:
-        pass
+        metrics.inc("timeouts", stage="network_idle")
 
     # Early block detection
     if is_blocked(page):
@@ -305,9 +371,16 @@ def scrape_first_city(page, city_url):
             debug_dump(page, prefix="blocked_paged")
             break
 
-        hotels_page = extract_hotels_from_page(page, cards_selector)
+        with metrics.span("extract_page"):
+            hotels_page = extract_hotels_from_page(page, cards_selector)
         hotels_all.extend(hotels_page)
+        if store is not None:
+            with metrics.span("write"):
+                store.upsert_many("marriott", [store_row(h, city_name) for h in hotels_page if h["hotel_name"]])
+        metrics.inc("pages")
+        metrics.inc("hotels", len(hotels_page))
         print(f"Collected {len(hotels_page)} hotels on page {seen_pages} (total {len(hotels_all)}).")
+        report_resources(page, filter_stats, f"Results page {seen_pages}")
         human_wait(1.0, 2.2)
 
         # Try next page
@@ -316,7 +389,8 @@ def scrape_first_city(page, city_url):
             break
 
         # Re-accept consent if it appears again
-        accept_consent_if_present(page)
+        with metrics.span("consent"):
+            accept_consent_if_present(page)
 
         # Re-detect selector if DOM changes
         maybe_new_selector = wait_for_hotel_cards(page)
@@ -327,13 +401,15 @@ def scrape_first_city(page, city_url):
 
 def main():
     os.makedirs(PROFILE_DIR, exist_ok=True)
+    store = HotelStore(STORE_FILE) if STORAGE in ("sqlite", "both") else None
 
     with sync_playwright() as p:
-        context, page = launch_browser(p)
+        with metrics.span("browser_start"):
+            context, page, filter_stats = launch_browser(p)
 
         try:
             # Step 1: City links
-            cities = collect_city_links(page)
+            cities = collect_city_links(page, filter_stats)
             if not cities:
                 print("No city links found; aborting.")
                 return
@@ -341,24 +417,55 @@ def main():
             # Step 2: Scrape first city
             city_url = cities[0]["url"]
             print(f"Scraping first city: {cities[0]['name']} -> {city_url}")
-            hotels = scrape_first_city(page, city_url)
+            hotels = scrape_first_city(page, city_url, filter_stats, store, cities[0]["name"])
 
             # Save hotels CSV
-            with open(OUTPUT_HOTELS, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    "hotel_name", "view_details", "review_score",
-                    "review_count", "distance", "description"
-                ])
-                writer.writeheader()
-                writer.writerows(hotels)
-
-            print(f"Saved {len(hotels)} hotels to {OUTPUT_HOTELS}")
+            if STORAGE in ("files", "both"):
+                with metrics.span("write"), open(OUTPUT_HOTELS, "w", newline="", encoding="utf-8") as f:
+                    writer = csv.DictWriter(f, fieldnames=[
+                        "hotel_name", "view_details", "review_score",
+                        "review_count", "distance", "description"
+                    ])
+                    writer.writeheader()
+                    writer.writerows(hotels)
+
+                print(f"Saved {len(hotels)} hotels to {OUTPUT_HOTELS}")
+            if store is not None:
+                print(f"Upserted {len(hotels)} hotels into {STORE_FILE}")
 
         finally:
             try:
                 context.close()
             except Exception:
                 pass
+            if store is not None:
+                store.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Marriott hotels scraper")
+    parser.add_argument("--profile", action="store_true",
+                        help="run under the sampling profiler: flame graph stacks plus a CPU / Playwright I/O / "
+                             "sleep summary")
+    parser.add_argument("--profile-out", default=PROFILE_OUT,
+                        help="path prefix for the .folded and .json profile outputs")
+    parser.add_argument("--storage", choices=["files", "sqlite", "both"], default=STORAGE,
+                        help="files: OUTPUT_HOTELS CSV; sqlite: upsert into --store-file; both (default)")
+    parser.add_argument("--store-file", default=STORE_FILE, help="SQLite hotel store (hotel_store.py)")
+    parser.add_argument("--metrics-jsonl", default=METRICS_JSONL,
+                        help="append stage timings/counters to this file as JSON lines (enables metrics)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="serve Prometheus metrics on localhost:PORT/metrics (enables metrics)")
+    parser.add_argument("--metrics-interval", type=float, default=METRICS_INTERVAL,
+                        help="seconds between JSON-lines metric snapshots")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    STORAGE = args.storage
+    STORE_FILE = args.store_file
+    configure_metrics(args.metrics_jsonl, args.metrics_port, args.metrics_interval)
+    try:
+        with profiled(args.profile_out if args.profile else None):
+            main()
+    finally:
+        metrics.close()
\ No newline at end of file
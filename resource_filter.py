@@ -0,0 +1,173 @@
+from collections import Counter
+from urllib.parse import urlsplit
+
+# ================== POLICY DEFAULTS ==================
+
+DEFAULT_BLOCK_TYPES = ("image", "font", "media")
+
+# Analytics/ad beacons neither scraper reads
+DEFAULT_BLOCK_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "connect.facebook.net",
+    "hotjar.com",
+    "demdex.net",
+    "omtrdc.net",
+    "quantummetric.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "tiqcdn.com",
+    "criteo.com",
+    "taboola.com",
+)
+
+# Network.setBlockedURLs only matches URL patterns, so resource types are
+# approximated by file extension on the Selenium path.
+TYPE_URL_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*"],
+    "font": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*.ogg*"],
+    "stylesheet": ["*.css*"],
+}
+
+# Rough transfer size of a blocked request, used only for the savings estimate
+ESTIMATED_BYTES = {
+    "image": 60_000,
+    "font": 40_000,
+    "media": 400_000,
+    "stylesheet": 30_000,
+    "script": 40_000,
+}
+ESTIMATED_BYTES_OTHER = 2_000
+
+# Bytes/requests the page actually loaded since the last call (Resource Timing)
+RESOURCE_TIMING_JS = """
+const entries = performance.getEntriesByType("resource");
+const bytes = entries.reduce((sum, e) => sum + (e.transferSize || 0), 0);
+performance.clearResourceTimings();
+performance.setResourceTimingBufferSize(10000);
+return {requests: entries.length, bytes: bytes};
+"""
+
+
+def domain_matches(host, domains):
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+class ResourcePolicy:
+    """Allow/deny rules by resource type and domain.
+
+    should_block() (Playwright) lets allowed domains win over every rule.
+    Network.setBlockedURLs has no exceptions, so on the Selenium path
+    (url_patterns()) allowed domains only lift domain blocks; type patterns
+    still apply to every host.
+    """
+
+    def __init__(self, block_types=DEFAULT_BLOCK_TYPES, block_domains=DEFAULT_BLOCK_DOMAINS, allow_domains=()):
+        self.block_types = {t.lower() for t in block_types}
+        self.block_domains = tuple(block_domains)
+        self.allow_domains = tuple(allow_domains)
+
+    def should_block(self, url, resource_type):
+        host = urlsplit(url).hostname or ""
+        if domain_matches(host, self.allow_domains):
+            return False
+        if domain_matches(host, self.block_domains):
+            return True
+        return (resource_type or "").lower() in self.block_types
+
+    def url_patterns(self):
+        """Patterns for Network.setBlockedURLs; allow_domains only prune the domain list here."""
+        patterns = [p for t in sorted(self.block_types) for p in TYPE_URL_PATTERNS.get(t, [])]
+        for domain in self.block_domains:
+            if not domain_matches(domain, self.allow_domains):
+                patterns += [f"*://{domain}/*", f"*://*.{domain}/*"]
+        return patterns
+
+
+class FilterStats:
+    def __init__(self):
+        self.blocked = Counter()
+
+    def add_blocked(self, resource_type):
+        self.blocked[(resource_type or "other").lower()] += 1
+
+    def estimated_bytes(self):
+        return sum(ESTIMATED_BYTES.get(t, ESTIMATED_BYTES_OTHER) * n for t, n in self.blocked.items())
+
+    def report(self, label, loaded=None):
+        by_type = ", ".join(f"{t} {n}" for t, n in self.blocked.most_common())
+        line = (f"🧹 {label}: blocked {sum(self.blocked.values())} requests "
+                f"(~{self.estimated_bytes() / 1024:.0f} KB est.{'; ' + by_type if by_type else ''})")
+        if loaded:
+            line += f", loaded {loaded['requests']} requests / {loaded['bytes'] / 1024:.0f} KB"
+        self.blocked.clear()
+        return line
+
+
+# ================== SELENIUM (CDP) ==================
+
+class SeleniumResourceFilter:
+    """Blocks requests through CDP Network.setBlockedURLs.
+
+    Blocked requests are counted from Network.loadingFailed events in the
+    performance log, fed in through observe().
+    """
+
+    def __init__(self, driver, policy):
+        self.driver = driver
+        self.policy = policy
+        self.stats = FilterStats()
+        self.types = {}
+
+    def install(self):
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.policy.url_patterns()})
+        return self
+
+    def observe(self, event):
+        method = event.get("method")
+        params = event.get("params", {})
+        if method == "Network.requestWillBeSent":
+            self.types[params.get("requestId")] = params.get("type")
+        elif method == "Network.loadingFailed":
+            resource_type = self.types.pop(params.get("requestId"), None) or params.get("type")
+            if params.get("blockedReason"):
+                self.stats.add_blocked(resource_type)
+        elif method == "Network.loadingFinished":
+            self.types.pop(params.get("requestId"), None)
+
+    def page_report(self, label):
+        try:
+            loaded = self.driver.execute_script(RESOURCE_TIMING_JS)
+        except Exception:
+            loaded = None
+        return self.stats.report(label, loaded)
+
+
+# ================== PLAYWRIGHT ==================
+
+def install_playwright_filter(context, policy):
+    """Route every request of a Playwright context through the policy; returns its FilterStats."""
+    stats = FilterStats()
+
+    def handle(route):
+        request = route.request
+        if policy.should_block(request.url, request.resource_type):
+            stats.add_blocked(request.resource_type)
+            route.abort()
+        else:
+            route.continue_()
+
+    context.route("**/*", handle)
+    return stats
+
+
+def playwright_page_report(page, stats, label):
+    try:
+        loaded = page.evaluate("() => {" + RESOURCE_TIMING_JS + "}")
+    except Exception:
+        loaded = None
+    return stats.report(label, loaded)
@@ -1,26 +1,22 @@
 import time
 import json
-import undetected_chromedriver as uc
+import argparse
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-def make_options():
-    opts = uc.ChromeOptions()
-    opts.add_argument("--start-maximized")
-    opts.add_argument("--disable-blink-features=AutomationControlled")
-    opts.add_argument("--no-sandbox")
-    opts.add_argument("--disable-dev-shm-usage")
-    return opts
+from hilton import START_URL, start_browser, wait_for_popup_content
+from hilton_health import process_tree_rss
 
-def main():
-    driver = uc.Chrome(options=make_options(), use_subprocess=True)
-    wait = WebDriverWait(driver, 60)
+def main(profile="default"):
+    # Launch time: uc patching + Chrome start until the session is usable
+    started = time.perf_counter()
+    driver, wait = start_browser(profile)
+    stats = {"profile": profile, "launch_s": time.perf_counter() - started}
 
     try:
-        driver.get("https://www.hilton.com/en/locations/pet-friendly/")
+        started = time.perf_counter()
+        driver.get(START_URL)
         wait.until(lambda d: d.execute_script("return document.readyState") == "complete")
-        time.sleep(3)
 
         # Click the first hotel details button
         view_btn = wait.until(
@@ -31,23 +27,8 @@ def main():
         driver.execute_script("arguments[0].click();", view_btn)
 
         # Wait until popup has real content
-        max_wait = 20
-        start = time.time()
-        while True:
-            try:
-                popup = driver.find_element(
-                    By.CSS_SELECTOR,
-                    "div.relative.flex.size-full.flex-col.overflow-y-auto.lg\\:h-auto.lg\\:flex-row"
-                )
-                # Count only elements with text
-                text_elements = [e for e in popup.find_elements(By.XPATH, ".//*") if e.text.strip()]
-                if len(text_elements) > 5:
-                    break
-            except:
-                pass
-            if time.time() - start > max_wait:
-                raise TimeoutError("Popup content did not load in time")
-            time.sleep(0.5)
+        popup = wait_for_popup_content(driver, timeout=20)
+        stats["first_popup_s"] = time.perf_counter() - started
 
         # Extract info (example: name + all text)
         data = {}
@@ -65,6 +46,9 @@ def main():
 
         print("✅ Hotel popup extracted → hilton_hotel.json")
 
+        rss = process_tree_rss(getattr(driver, "browser_pid", None))
+        stats["rss_mb"] = rss / 2**20 if rss is not None else None
+
     except Exception as e:
         print("❌ Error:", e)
 
@@ -74,5 +58,17 @@ def main():
         except:
             pass
 
+    rss = f"{stats['rss_mb']:.0f} MB" if stats.get("rss_mb") else "n/a (needs psutil)"
+    popup_s = f"{stats['first_popup_s']:.2f}s" if "first_popup_s" in stats else "n/a"
+    print(f"⏱ {profile}: launch {stats['launch_s']:.2f}s, first popup {popup_s}, Chrome RSS {rss}")
+    return stats
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Smoke check: open one Hilton popup")
+    parser.add_argument("--launch-profile", choices=["default", "lean", "compare"], default="default",
+                        help="Chrome launch profile; compare runs default then lean")
+    args = parser.parse_args()
+    profiles = ["default", "lean"] if args.launch_profile == "compare" else [args.launch_profile]
+    results = [main(p) for p in profiles]
+    if len(results) > 1:
+        print(json.dumps(results, indent=2))